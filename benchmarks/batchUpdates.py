@@ -0,0 +1,66 @@
+"""
+Appending many rows to an ObservableList one by one and inside ObservableList.batch().
+The batch is sent to the frontend as one insert of all rows.
+
+    python benchmarks/batchUpdates.py
+"""
+import time
+from fakeFrontend import connect, wait_idle
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable, ObservableList, ObservableListView
+
+ROWS = 5000
+
+
+class Row(Observable):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+
+class Rows(Observable):
+    def __init__(self):
+        super().__init__()
+        self.rows = ObservableList()
+
+
+class RowView(PyHtmlView):
+    DOM_ELEMENT = "tr"
+    TEMPLATE_STR = '<td>{{ pyview.subject.name }}</td>'
+
+
+class TableView(PyHtmlView):
+    TEMPLATE_STR = '<table>{{ pyview.rows.render() }}</table>'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = ObservableListView(subject.rows, self, RowView, dom_element="tbody")
+
+
+def append_rows(app):
+    for i in range(ROWS):
+        app.rows.append(Row("row %s" % i))
+
+
+def append_rows_batched(app):
+    with app.rows.batch():
+        append_rows(app)
+
+
+def run(name, append):
+    app = Rows()
+    gui = PyHtmlGui(app_instance=app, view_class=TableView, listen_port=0)
+    ws = connect(gui)
+    ws.take()
+    t = time.perf_counter()
+    append(app)
+    wait_idle(ws, timeout=60)
+    duration = time.perf_counter() - t
+    messages = ws.take()
+    print("%-10s %10.1f %10s %12s" % (name, duration * 1000, len(messages), sum([len(m) for m in messages])))
+
+
+if __name__ == "__main__":
+    print("%s appends" % ROWS)
+    print("%-10s %10s %10s %12s" % ("mode", "ms", "messages", "bytes"))
+    run("single", append_rows)
+    run("batch", append_rows_batched)
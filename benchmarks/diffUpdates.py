@@ -0,0 +1,105 @@
+"""
+Compare bytes on the wire and update cost of replace_element updates versus diff_updates=True.
+
+    python benchmarks/diffUpdates.py             # headless, server side cost and bytes
+    python benchmarks/diffUpdates.py --browser   # additionally measure client apply time in the default browser
+"""
+import sys
+import time
+import json
+import webbrowser
+from fakeFrontend import connect, wait_idle
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable
+
+UPDATES = 200
+ROWS = 500
+
+
+class Dashboard(Observable):
+    def __init__(self):
+        super().__init__()
+        self.value = 0
+        self.rows = ["sensor %s" % i for i in range(ROWS)]
+
+    def tick(self):
+        self.value += 1
+        self.notify_observers()
+
+
+class DashboardView(PyHtmlView):
+    TEMPLATE_STR = '''
+        <h3>Dashboard</h3>
+        <p>Counter: <b>{{ pyview.subject.value }}</b></p>
+        <input type="text" value="keeps focus in diff mode">
+        <table>
+            {% for row in pyview.subject.rows %}
+                <tr><td>{{ loop.index }}</td><td>{{ row }}</td><td><button onclick="pyview.subject.tick()">tick</button></td></tr>
+            {% endfor %}
+        </table>
+    '''
+
+
+INSTRUMENT_JS = '''
+    if(window.__bench === undefined){
+        window.__bench = {ms: 0, calls: 0};
+        ["replace_element", "patch_element"].forEach(function(name){
+            var f = pyhtmlgui[name];
+            pyhtmlgui[name] = function(){
+                var t = performance.now();
+                var r = f.apply(this, arguments);
+                window.__bench.ms += performance.now() - t;
+                window.__bench.calls += 1;
+                return r;
+            };
+        });
+    }
+    window.__bench.ms = 0; window.__bench.calls = 0;
+    return true;
+'''
+
+
+def run_headless(diff_updates):
+    app = Dashboard()
+    gui = PyHtmlGui(app_instance=app, view_class=DashboardView, listen_port=0, diff_updates=diff_updates)
+    ws = connect(gui)
+    ws.take()
+    t = time.perf_counter()
+    for _ in range(UPDATES):
+        app.tick()
+    wait_idle(ws)
+    duration = time.perf_counter() - t
+    messages = ws.take()
+    return duration, len(messages), sum([len(m) for m in messages])
+
+
+def run_browser(diff_updates):
+    app = Dashboard()
+    gui = PyHtmlGui(app_instance=app, view_class=DashboardView, diff_updates=diff_updates)
+    gui.start(show_frontend=False, block=False)
+    webbrowser.open(gui.get_url())
+    instance = gui._endpoints[""]
+    while len(instance._gui_instances) == 0 or instance._gui_instances[0].connections_count == 0:
+        time.sleep(0.1)
+    time.sleep(2)
+    view = instance._gui_instances[0]._view
+    view.eval_javascript(INSTRUMENT_JS)()
+    for _ in range(UPDATES):
+        app.tick()
+        time.sleep(0.01)
+    time.sleep(1)
+    result = view.eval_javascript("return window.__bench;")()[0]
+    gui.stop()
+    return result["ms"], result["calls"]
+
+
+if __name__ == "__main__":
+    print("%s updates of a view with %s rows" % (UPDATES, ROWS))
+    print("%-10s %12s %10s %14s %14s" % ("mode", "server ms", "frames", "bytes", "bytes/update"))
+    for mode in [False, True]:
+        duration, frames, size = run_headless(mode)
+        print("%-10s %12.1f %10s %14s %14.0f" % ("diff" if mode else "replace", duration * 1000, frames, size, size / max(frames, 1)))
+    if "--browser" in sys.argv:
+        print("%-10s %16s %10s" % ("mode", "client apply ms", "calls"))
+        for mode in [False, True]:
+            ms, calls = run_browser(mode)
+            print("%-10s %16.1f %10s" % ("diff" if mode else "replace", ms, calls))
@@ -0,0 +1,52 @@
+"""
+Helpers to drive a PyHtmlGui without browser. A FakeWebsocket is passed to an endpoint like flask_sock would,
+everything the server sends is recorded so benchmarks can count frames and bytes.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+
+
+class FakeWebsocket:
+    def __init__(self):
+        self.inbox = queue.Queue()
+        self.sent = []
+
+    def receive(self, timeout=None):
+        return self.inbox.get()
+
+    def send(self, message):
+        self.sent.append(message)
+
+    def close(self, *args, **kwargs):
+        self.inbox.put(None)
+
+    def call(self, name, args=None, skip_results=True):
+        self.inbox.put(json.dumps({"call": 1, "name": name, "args": args if args is not None else [], "skip_results": skip_results}))
+
+    def take(self):
+        messages, self.sent = self.sent, []
+        return messages
+
+
+def connect(gui, endpoint="", wait=0.2):
+    ws = FakeWebsocket()
+    threading.Thread(target=gui._endpoints[endpoint].process_websocket, args=(ws,), daemon=True).start()
+    ws.call("frontend_ready")
+    time.sleep(wait)
+    return ws
+
+
+def wait_idle(ws, timeout=5.0):
+    """ wait until the send queue of the fake connection has stopped growing """
+    last, t = -1, time.time()
+    while time.time() - t < timeout:
+        if len(ws.sent) == last:
+            return
+        last = len(ws.sent)
+        time.sleep(0.05)
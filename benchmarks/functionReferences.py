@@ -0,0 +1,105 @@
+"""
+Cost of registering event handlers while rendering a list with many rows, every row has two pyview handlers in its template.
+Compare with --legacy, which derives ids from object id and function name and can give two handlers the same id.
+
+    python benchmarks/functionReferences.py
+    python benchmarks/functionReferences.py --legacy
+"""
+import sys
+import time
+import weakref
+from fakeFrontend import connect
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable, ObservableList, ObservableListView
+from pyhtmlgui import pyhtmlguiInstance
+from pyhtmlgui.lib import WeakFunctionReferences
+
+ROWS = 10000
+
+
+class LegacyWeakFunctionReferences(WeakFunctionReferences):
+    def add(self, function):
+        try:
+            _id = id(function.__self__)
+        except:
+            _id = id(function)
+        callback_id = (_id ^ hash(function.__name__)) & 0xffffffffffff
+        if callback_id in self.references:
+            return callback_id
+        self.references[callback_id] = weakref.WeakMethod(function, self._create_delete_callback(callback_id, None))
+        return callback_id
+
+
+class Row(Observable):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+
+class Rows(Observable):
+    def __init__(self, count):
+        super().__init__()
+        self.rows = ObservableList([Row("row %s" % i) for i in range(count)])
+
+
+class RowView(PyHtmlView):
+    DOM_ELEMENT = "tr"
+    RENDER_CACHE = False  # render every row again, so handlers are registered on every render
+    TEMPLATE_STR = '''
+        <td>{{ pyview.subject.name }}</td>
+        <td><button onclick="pyview.select()">select</button><button onclick="pyview.delete_row()">delete</button></td>
+    '''
+
+    def select(self):
+        pass
+
+    def delete_row(self):
+        pass
+
+
+class TableView(PyHtmlView):
+    TEMPLATE_STR = '<table>{{ pyview.rows.render() }}</table>'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = ObservableListView(subject.rows, self, RowView, dom_element="tbody")
+
+
+def measure_registration(references, views):
+    t = time.perf_counter()
+    for view in views:
+        references.add(view.select)
+        references.add(view.delete_row)
+    return time.perf_counter() - t
+
+
+if __name__ == "__main__":
+    legacy = "--legacy" in sys.argv
+    app = Rows(ROWS)
+    gui = PyHtmlGui(app_instance=app, view_class=TableView, listen_port=0)
+    if legacy:
+        pyhtmlguiInstance.WeakFunctionReferences = LegacyWeakFunctionReferences
+    ws = connect(gui, wait=0)
+    while len(ws.sent) == 0:
+        time.sleep(0.01)
+    instance = gui._endpoints[""]._gui_instances[0]
+    views = instance._view.rows.get_items()
+
+    first = measure_registration(instance._function_references, views)
+    again = measure_registration(instance._function_references, views)
+    ids = set()
+    for view in views:
+        ids.add(instance._create_function_reference(view.select))
+        ids.add(instance._create_function_reference(view.delete_row))
+
+    renders = []
+    for _ in range(5):
+        instance._view.rows._render_dirty = True
+        t = time.perf_counter()
+        instance._view.rows.render()
+        renders.append(time.perf_counter() - t)
+
+    print("%s rows, %s handlers" % (ROWS, ROWS * 2))
+    print("registration        %8.1f ms" % (min(first, again) * 1000))
+    print("render              %8.1f ms" % (min(renders) * 1000))
+    print("distinct ids        %8s" % len(ids))
+    print("registry entries    %8s" % len(instance._function_references.references))
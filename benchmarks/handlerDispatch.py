@@ -0,0 +1,74 @@
+"""
+Latency of fast python calls sent by a frontend right after a slow one (eg. a database query).
+Without handler_threads the fast calls wait in the receive loop until the slow call is finished,
+with a handler pool they are answered right away. Calls to the same view keep their order with handler_ordering="view".
+
+    python benchmarks/handlerDispatch.py
+"""
+import json
+import time
+from fakeFrontend import connect
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable
+
+SLOW_SECONDS = 1.0
+FAST_CALLS = 20
+
+
+class SlowView(PyHtmlView):
+    TEMPLATE_STR = '<button onclick="pyview.query()">query</button>'
+
+    def query(self):
+        time.sleep(SLOW_SECONDS)
+        return "done"
+
+
+class AppView(PyHtmlView):
+    TEMPLATE_STR = '{{ pyview.slow.render() }}<button onclick="pyview.ping()">ping</button>'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.slow = SlowView(subject, self)
+
+    def ping(self, value):
+        return value
+
+
+def run(name, **kwargs):
+    gui = PyHtmlGui(app_instance=Observable(), view_class=AppView, listen_port=0, **kwargs)
+    ws = connect(gui)
+    instance = gui._endpoints[""]._gui_instances[0]
+    query_id = instance._create_function_reference(instance._view.slow.query)
+    ping_id = instance._create_function_reference(instance._view.ping)
+    ws.take()
+
+    sent = {}
+    ws.inbox.put(json.dumps({"call": 1, "name": "call_python_function", "args": [query_id]}))
+    sent[1] = time.perf_counter()
+    for call in range(2, FAST_CALLS + 2):
+        ws.inbox.put(json.dumps({"call": call, "name": "call_python_function_with_args", "args": [ping_id, [call]]}))
+        sent[call] = time.perf_counter()
+
+    latencies, order = {}, []
+    while len(latencies) < len(sent):
+        for message in ws.take():
+            data = json.loads(message)
+            if "return" in data:
+                latencies[data["return"]] = time.perf_counter() - sent[data["return"]]
+                order.append(data["return"])
+        time.sleep(0.001)
+    fast = sorted(latencies[call] for call in range(2, FAST_CALLS + 2))
+    fast_order = [call for call in order if call != 1]
+    print("%-16s %12.1f %14.1f %14.1f %14s" % (name, latencies[1] * 1000, fast[len(fast) // 2] * 1000, fast[-1] * 1000,
+                                               fast_order == sorted(fast_order)))
+    stats = instance.get_stats().get("handler_pool")
+    if stats is not None:
+        print("%16s max queued %s, wait avg %.2f ms, %s" % ("", stats["max_queued"], stats["wait_ms_avg"],
+              ", ".join("%s %.1f ms avg" % (handler, s["ms_avg"]) for handler, s in stats["handlers"].items())))
+
+
+if __name__ == "__main__":
+    print("%s fast calls after one call that takes %ss" % (FAST_CALLS, SLOW_SECONDS))
+    print("%-16s %12s %14s %14s %14s" % ("dispatch", "slow ms", "fast p50 ms", "fast max ms", "fast in order"))
+    run("inline")
+    run("pool, view", handler_threads=4)
+    run("pool, instance", handler_threads=4, handler_ordering="instance")
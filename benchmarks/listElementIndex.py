@@ -0,0 +1,74 @@
+"""
+Render and mutation cost of an ObservableListView whose rows show their element_index().
+Rendering should grow linearly with the number of rows, compare with --legacy which looks up every index with list.index().
+
+    python benchmarks/listElementIndex.py
+    python benchmarks/listElementIndex.py --legacy
+"""
+import sys
+import time
+from fakeFrontend import connect, wait_idle
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable, ObservableList, ObservableListView
+
+SIZES = [5000, 10000, 20000, 50000]
+
+
+class Row(Observable):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+
+class Rows(Observable):
+    def __init__(self, count):
+        super().__init__()
+        self.rows = ObservableList([Row("row %s" % i) for i in range(count)])
+
+
+class RowView(PyHtmlView):
+    DOM_ELEMENT = "tr"
+    TEMPLATE_STR = '<td>{{ pyview.element_index() }}</td><td>{{ pyview.subject.name }}</td>'
+
+
+class TableView(PyHtmlView):
+    TEMPLATE_STR = '<table>{{ pyview.rows.render() }}</table>'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = ObservableListView(subject.rows, self, RowView, dom_element="tbody")
+
+
+def legacy_get_element_index(self, element):
+    element.element_index_used = True
+    return self._wrapped_data.index(element)
+
+
+def run(count):
+    app = Rows(count)
+    gui = PyHtmlGui(app_instance=app, view_class=TableView, listen_port=0)
+    t = time.perf_counter()
+    ws = connect(gui, wait=0)
+    while len(ws.sent) == 0:
+        time.sleep(0.001)
+    render = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for i in range(100):
+        app.rows.append(Row("new row %s" % i))
+    wait_idle(ws, timeout=60)
+    append = time.perf_counter() - t
+
+    t = time.perf_counter()
+    app.rows.insert(count // 2, Row("inserted row"))  # all following rows show a new index
+    wait_idle(ws, timeout=60)
+    insert = time.perf_counter() - t
+    return render, append, insert
+
+
+if __name__ == "__main__":
+    if "--legacy" in sys.argv:
+        ObservableListView.get_element_index = legacy_get_element_index
+    print("%8s %12s %18s %18s" % ("rows", "render ms", "100 appends ms", "insert middle ms"))
+    for size in SIZES:
+        render, append, insert = run(size)
+        print("%8s %12.1f %18.1f %18.1f" % (size, render * 1000, append * 1000, insert * 1000))
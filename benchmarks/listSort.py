@@ -0,0 +1,77 @@
+"""
+Cost of reordering an ObservableListView. Sorting the subject list moves dom elements instead of rendering the list again,
+compare bytes sent with the size of a full render of the list.
+
+    python benchmarks/listSort.py
+"""
+import json
+import random
+import time
+from fakeFrontend import connect, wait_idle
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable, ObservableList, ObservableListView
+
+ROWS = 10000
+
+
+class Row(Observable):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+
+class Rows(Observable):
+    def __init__(self, count):
+        super().__init__()
+        self.rows = ObservableList([Row(random.randrange(1000000)) for _ in range(count)])
+
+
+class RowView(PyHtmlView):
+    DOM_ELEMENT = "tr"
+    TEMPLATE_STR = '<td>{{ pyview.subject.value }}</td><td><button onclick="pyview.subject.notify_observers()">refresh</button></td>'
+
+
+class TableView(PyHtmlView):
+    TEMPLATE_STR = '<table>{{ pyview.rows.render() }}</table>'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = ObservableListView(subject.rows, self, RowView, dom_element="tbody")
+
+
+def count_moves(messages):
+    moves = 0
+    for message in messages:
+        data = json.loads(message)
+        if data["name"] == "pyhtmlgui.call_batch":
+            moves += len([call for call in data["args"][0] if call[0] == "pyhtmlgui.move_element"])
+        elif data["name"] == "pyhtmlgui.move_element":
+            moves += 1
+    return moves
+
+
+def run(name, reorder, prepare=None):
+    app = Rows(ROWS)
+    if prepare is not None:
+        prepare(app.rows)
+    gui = PyHtmlGui(app_instance=app, view_class=TableView, listen_port=0)
+    ws = connect(gui, wait=0)
+    while len(ws.sent) == 0:
+        time.sleep(0.01)
+    render_size = len(ws.take()[0])
+    t = time.perf_counter()
+    reorder(app.rows)
+    wait_idle(ws)
+    duration = time.perf_counter() - t
+    messages = ws.take()
+    print("%-22s %10.1f %10s %12s %16s" % (name, duration * 1000, count_moves(messages), sum([len(m) for m in messages]), render_size))
+
+
+if __name__ == "__main__":
+    print("%s rows" % ROWS)
+    print("%-22s %10s %10s %12s %16s" % ("reorder", "server ms", "moves", "bytes", "full render bytes"))
+    run("sort", lambda rows: rows.sort(key=lambda row: row.value))
+    run("reverse", lambda rows: rows.reverse())
+    run("sort, 1% out of order", lambda rows: rows.sort(key=lambda row: row.value), prepare=lambda rows: (
+        rows.sort(key=lambda row: row.value),
+        [setattr(row, "value", random.randrange(1000000)) for row in random.sample(rows, ROWS // 100)],
+    ))
@@ -0,0 +1,78 @@
+"""
+Encode and decode throughput and bytes per message of the message codecs, for typical render and call traffic.
+Codecs that are not installed are skipped, decode is measured with the codec's own library,
+in the browser json is decoded by JSON.parse and msgpack by pyhtmlgui._decode_msgpack.
+
+    python benchmarks/messageCodecs.py
+"""
+import random
+import time
+import fakeFrontend  # noqa, adds the repository to sys.path
+from pyhtmlgui.messageCodecs import MESSAGE_CODECS
+
+ROWS = 2000
+
+
+def render_message():
+    rows = "".join('<tr id="pv%016d"><td class="name">Row "%s" &amp; more</td><td>%s</td></tr>' % (i, i, random.random()) for i in range(ROWS))
+    return {"call": 1, "name": "pyhtmlgui.update_element", "args": ["pyHtmlGuiBody", "<table>%s</table>" % rows], "skip_results": True}
+
+
+def batch_message():
+    calls = [["pyhtmlgui.replace_element", ["pv%016d" % i, '<div id="pv%016d">value %s</div>' % (i, i)]] for i in range(500)]
+    return {"call": 2, "name": "pyhtmlgui.call_batch", "args": [calls], "skip_results": True}
+
+
+def numbers_message():
+    return {"call": 3, "name": "chart.set_data", "args": [[random.random() * 1000 for _ in range(10000)], list(range(10000))]}
+
+
+def return_message():
+    return {"return": 4, "value": 42}
+
+
+def python_call():
+    return '{"call": 5, "name": "call_python_function_with_args", "args": ["17", [23, "text"]], "skip_results": false}'
+
+
+def decoder(codec):
+    if codec.format == "msgpack":
+        import msgpack
+        return msgpack.unpackb
+    return codec.decode
+
+
+def measure(function, argument, min_time=0.2):
+    count, t = 0, time.perf_counter()
+    while True:
+        function(argument)
+        count += 1
+        elapsed = time.perf_counter() - t
+        if elapsed > min_time:
+            return elapsed / count
+
+
+def run(name, message, codecs):
+    for codec in codecs:
+        encoded = codec.encode(message)
+        size = len(encoded.encode() if isinstance(encoded, str) else encoded)
+        encode = measure(codec.encode, message)
+        decode = measure(decoder(codec), encoded)
+        print("%-16s %-8s %10s %12.1f %12.1f %12.1f %12.1f" % (
+            name, codec.name, size, encode * 1000000, size / encode / 1000000, decode * 1000000, size / decode / 1000000))
+
+
+if __name__ == "__main__":
+    codecs = [codec for codec in MESSAGE_CODECS.values() if codec.is_available()]
+    missing = [codec.name for codec in MESSAGE_CODECS.values() if not codec.is_available()]
+    if len(missing) > 0:
+        print("not installed: %s" % ", ".join(missing))
+    print("%-16s %-8s %10s %12s %12s %12s %12s" % ("traffic", "codec", "bytes", "encode us", "encode MB/s", "decode us", "decode MB/s"))
+    run("render", render_message(), codecs)
+    run("call batch", batch_message(), codecs)
+    run("numeric arrays", numbers_message(), codecs)
+    run("return value", return_message(), codecs)
+    for codec in codecs:  # frontends send json to every codec
+        call = python_call()
+        decode = measure(codec.decode, call)
+        print("%-16s %-8s %10s %12s %12s %12.1f %12.1f" % ("python call", codec.name, len(call), "-", "-", decode * 1000000, len(call) / decode / 1000000))
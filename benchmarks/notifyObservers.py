@@ -0,0 +1,61 @@
+"""
+Throughput of Observable.notify_observers with different numbers of attached observers,
+compare with --legacy which dereferences all observers into new lists and inspects their arguments on every call.
+
+    python benchmarks/notifyObservers.py
+    python benchmarks/notifyObservers.py --legacy
+"""
+import sys
+import time
+import fakeFrontend  # noqa: F401, adds the repository to the import path
+from pyhtmlgui import Observable
+from pyhtmlgui.lib import WeakFunctionReferences
+
+OBSERVERS = [0, 1, 10, 1000]
+DURATION = 1.0
+
+
+class LegacyObservable(Observable):
+    def __init__(self):
+        super().__init__()
+        self._observers = WeakFunctionReferences()
+
+    def attach_observer(self, target_function):
+        self._observers.add(target_function)
+
+    def notify_observers(self, **kwargs):
+        for target_function in self._observers.get_all():
+            if target_function.__code__.co_argcount > 1:
+                target_function(self, **kwargs)
+            else:
+                target_function()
+
+
+class Observer:
+    def __init__(self):
+        self.count = 0
+
+    def on_update(self, source, **kwargs):
+        self.count += 1
+
+
+def run(observable_class, count):
+    observable = observable_class()
+    observers = [Observer() for _ in range(count)]
+    for observer in observers:
+        observable.attach_observer(observer.on_update)
+    notifications = 0
+    t = time.perf_counter()
+    while time.perf_counter() - t < DURATION:
+        for _ in range(100):
+            observable.notify_observers(value=1)
+        notifications += 100
+    return notifications / (time.perf_counter() - t)
+
+
+if __name__ == "__main__":
+    observable_class = LegacyObservable if "--legacy" in sys.argv else Observable
+    print("%10s %18s %18s" % ("observers", "notifications/s", "callbacks/s"))
+    for count in OBSERVERS:
+        rate = run(observable_class, count)
+        print("%10s %18.0f %18.0f" % (count, rate, rate * count))
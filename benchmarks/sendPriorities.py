@@ -0,0 +1,111 @@
+"""
+Response time of a button click while a dashboard floods a slow connection with panel updates.
+Without send_priorities the result of the click and the update of the button wait behind all queued panel updates,
+with send_priorities they are sent next.
+
+    python benchmarks/sendPriorities.py
+"""
+import json
+import threading
+import time
+from fakeFrontend import FakeWebsocket
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable
+
+PANELS = 100
+PANEL_SIZE = 20000  # bytes
+BANDWIDTH = 4000000  # bytes per second of the simulated connection
+
+
+class SlowWebsocket(FakeWebsocket):
+    def send(self, message):
+        time.sleep(len(message) / BANDWIDTH)
+        super().send(message)
+
+
+class Panel(Observable):
+    def __init__(self):
+        super().__init__()
+        self.value = 0
+
+
+class Dashboard(Observable):
+    def __init__(self):
+        super().__init__()
+        self.panels = [Panel() for _ in range(PANELS)]
+        self.clicks = 0
+
+
+class PanelView(PyHtmlView):
+    TEMPLATE_STR = '<div>{{ pyview.subject.value }}</div><pre>{{ pyview.padding }}</pre>'
+    padding = "x" * PANEL_SIZE
+
+
+class ButtonView(PyHtmlView):
+    TEMPLATE_STR = '<button onclick="pyview.click()">clicked {{ pyview.subject.clicks }}</button>'
+
+    def click(self):
+        self.subject.clicks += 1
+        self.update()
+        return self.subject.clicks
+
+
+class DashboardView(PyHtmlView):
+    TEMPLATE_STR = '''
+        {{ pyview.button.render() }}
+        {% for panel in pyview.panels %}{{ panel.render() }}{% endfor %}
+    '''
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.button = ButtonView(subject, self)
+        self.panels = [PanelView(panel, self) for panel in subject.panels]
+
+    def _on_subject_updated(self, source, **kwargs):
+        pass  # only the button and the panels update
+
+
+def run(name, **kwargs):
+    app = Dashboard()
+    gui = PyHtmlGui(app_instance=app, view_class=DashboardView, listen_port=0, handler_threads=2, **kwargs)
+    ws = SlowWebsocket()
+    threading.Thread(target=gui._endpoints[""].process_websocket, args=(ws,), daemon=True).start()
+    ws.call("frontend_ready")
+    while len(ws.sent) == 0:
+        time.sleep(0.01)
+    instance = gui._endpoints[""]._gui_instances[0]
+    click_id = instance._create_function_reference(instance._view.button.click)
+    button_uid = instance._view.button.uid
+    ws.take()
+
+    for panel in app.panels:  # observers in a background thread
+        panel.value += 1
+        panel.notify_observers()
+    t = time.perf_counter()
+    ws.inbox.put(json.dumps({"call": 1, "name": "call_python_function", "args": [click_id]}))
+
+    returned = updated = None
+    seen = 0
+    while returned is None or updated is None:
+        sent = list(ws.sent)
+        for message in sent[seen:]:
+            if returned is None and '"return": 1' in message:
+                returned = time.perf_counter() - t
+            if updated is None and button_uid in message and "clicked 1" in message:
+                updated = time.perf_counter() - t
+        seen = len(sent)
+        time.sleep(0.001)
+    while len(ws.sent) < PANELS + 2:
+        time.sleep(0.01)
+    total = time.perf_counter() - t
+    print("%-18s %12.1f %16.1f %20.1f" % (name, returned * 1000, updated * 1000, total * 1000))
+    return instance
+
+
+if __name__ == "__main__":
+    print("%s panel updates of %s KB queued on a %s MB/s connection" % (PANELS, PANEL_SIZE // 1000, BANDWIDTH / 1000000))
+    print("%-18s %12s %16s %20s" % ("queue", "return ms", "button update ms", "all updates sent ms"))
+    run("fifo")
+    instance = run("send_priorities", send_priorities=True)
+    for lane, stats in instance.get_stats()["send_queues"][0]["lanes"].items():
+        print("  lane %-8s sent %4s, max pending %4s, demoted %s, sent early against starvation %s" % (
+            lane, stats["sent"], stats["max_pending"], stats["demoted"], stats["starved"]))
@@ -0,0 +1,83 @@
+"""
+Initial render of a large list with ObservableListView and VirtualListView, and cost of scrolling the virtual list.
+The virtual list only renders the rows in the viewport, its render time and html size don't depend on the list length.
+
+    python benchmarks/virtualList.py
+"""
+import time
+import tracemalloc
+from fakeFrontend import connect, wait_idle
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable, ObservableList, ObservableListView, VirtualListView
+
+ROWS = 200000
+
+
+class Row(Observable):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+
+class Rows(Observable):
+    def __init__(self, count):
+        super().__init__()
+        self.rows = ObservableList([Row("row %s" % i) for i in range(count)])
+
+
+class RowView(PyHtmlView):
+    TEMPLATE_STR = '{{ pyview.subject.name }}'
+
+
+class FullListView(PyHtmlView):
+    TEMPLATE_STR = '{{ pyview.rows.render() }}'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = ObservableListView(subject.rows, self, RowView)
+
+
+class VirtualView(PyHtmlView):
+    TEMPLATE_STR = '{{ pyview.rows.render() }}'
+
+    def __init__(self, subject, parent, **kwargs):
+        super().__init__(subject, parent, **kwargs)
+        self.rows = VirtualListView(subject.rows, self, RowView, row_height=30, height=600)
+
+
+def run(name, view_class, app):
+    gui = PyHtmlGui(app_instance=app, view_class=view_class, listen_port=0)
+    tracemalloc.start()
+    t = time.perf_counter()
+    ws = connect(gui, wait=0)
+    while len(ws.sent) == 0:
+        time.sleep(0.001)
+    duration = time.perf_counter() - t
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%-20s %12.1f %14s %12.1f" % (name, duration * 1000, len(ws.take()[0]), memory / 1024 / 1024))
+    return gui, ws
+
+
+if __name__ == "__main__":
+    app = Rows(ROWS)
+    print("%s rows" % ROWS)
+    print("%-20s %12s %14s %12s" % ("view", "render ms", "html bytes", "peak MB"))
+    run("ObservableListView", FullListView, app)
+    gui, ws = run("VirtualListView", VirtualView, app)
+
+    rows = gui._endpoints[""]._gui_instances[0]._view.rows
+    t = time.perf_counter()
+    for scroll_top in range(0, 30 * 1000, 90):  # scroll down 1000 rows, 3 rows per event
+        rows.set_viewport(scroll_top, 600)
+    wait_idle(ws)
+    duration = time.perf_counter() - t
+    messages = ws.take()
+    print("scroll 1000 rows: %.1f ms, %s messages, %s bytes" % (duration * 1000, len(messages), sum([len(m) for m in messages])))
+
+    t = time.perf_counter()
+    for i in range(100):
+        app.rows.append(Row("new row %s" % i))
+    wait_idle(ws)
+    duration = time.perf_counter() - t
+    messages = ws.take()
+    print("100 appends: %.1f ms, %s bytes" % (duration * 1000, sum([len(m) for m in messages])))
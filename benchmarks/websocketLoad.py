@@ -0,0 +1,196 @@
+"""
+Many concurrently connected frontends, threaded against asyncio server backend.
+Each backend is started in its own process, a minimal websocket client opens all connections from this process.
+The server broadcasts a timestamp once per second, reports connections held, server threads,
+server memory per connection and the latency of the broadcast.
+
+    python benchmarks/websocketLoad.py
+    python benchmarks/websocketLoad.py --connections 500
+"""
+import asyncio
+import base64
+import logging
+import os
+import re
+import resource
+import statistics
+import struct
+import subprocess
+import sys
+import time
+import urllib.request
+from fakeFrontend import connect  # noqa, sets up sys.path
+from pyhtmlgui import PyHtmlGui, PyHtmlView, Observable
+
+CONNECTIONS = 2000
+TICKS = 5
+CONNECT_CONCURRENCY = 100
+
+
+class Clock(Observable):
+    def __init__(self):
+        super().__init__()
+        self.timestamp = time.time()
+
+    def tick(self):
+        self.timestamp = time.time()
+        self.notify_observers()
+
+
+class ClockView(PyHtmlView):
+    TEMPLATE_STR = '<span>ts:{{ pyview.subject.timestamp }}:</span>'
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def serve(backend):
+    raise_file_limit()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no log line per request
+    app = Clock()
+    gui = PyHtmlGui(app_instance=app, view_class=ClockView, listen_port=0, server_backend=backend, send_queue_size=100)
+    gui.start(block=False)
+    print(gui.get_url(), flush=True)
+    while True:
+        time.sleep(1)
+        app.tick()
+
+
+def process_status(pid):
+    status = {}
+    with open("/proc/%s/status" % pid) as f:
+        for line in f:
+            name, value = line.split(":", 1)
+            status[name] = value.strip().split(" ")[0]
+    return int(status["VmRSS"]) * 1024, int(status["Threads"])
+
+
+class Client:
+    def __init__(self, host, port, cookie, csrf_token):
+        self.host, self.port, self.cookie, self.csrf_token = host, port, cookie, csrf_token
+        self.reader = self.writer = None
+        self.latencies = []
+        self.rendered = asyncio.Event()
+        self.open = False
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        key = base64.b64encode(os.urandom(16)).decode()
+        self.writer.write(("GET /ws?token=%s HTTP/1.1\r\nHost: %s:%s\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                           "Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\nCookie: %s\r\n\r\n" % (
+                            self.csrf_token, self.host, self.port, key, self.cookie)).encode())
+        response = await self.reader.readuntil(b"\r\n\r\n")
+        if not response.startswith(b"HTTP/1.1 101"):
+            raise Exception("Websocket handshake failed: %s" % response.split(b"\r\n")[0])
+        self.open = True
+        self.send('{"call": 1, "name": "frontend_ready", "args": [], "skip_results": true}')
+
+    def send(self, text):
+        payload = text.encode()
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        if len(payload) < 126:
+            head = struct.pack("!BB", 0x81, 0x80 | len(payload))
+        else:
+            head = struct.pack("!BBH", 0x81, 0x80 | 126, len(payload))
+        self.writer.write(head + mask + masked)
+
+    async def receive_loop(self):
+        try:
+            while True:
+                head = await self.reader.readexactly(2)
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+                payload = await self.reader.readexactly(length)
+                if head[0] & 0x0F == 0x8:
+                    break
+                match = re.search(rb"ts:([0-9.]+):", payload)
+                if match is not None:
+                    if self.rendered.is_set():
+                        self.latencies.append(time.time() - float(match.group(1)))
+                    self.rendered.set()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.open = False
+
+
+async def load(url, pid, connections):
+    host, port = re.match(r"http://([^:/]+):(\d+)", url).groups()
+    response = urllib.request.urlopen(url)
+    cookie = "; ".join(header.split(";")[0] for header in response.headers.get_all("Set-Cookie"))
+    csrf_token = re.search(r'csrf_token = "([^"]+)"', response.read().decode()).group(1)
+    rss_before, threads_before = process_status(pid)
+
+    clients = [Client(host, int(port), cookie, csrf_token) for _ in range(connections)]
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    tasks = []
+
+    async def open_client(client):
+        async with semaphore:
+            try:
+                await client.connect()
+            except Exception:
+                return
+            tasks.append(asyncio.ensure_future(client.receive_loop()))
+            try:
+                await asyncio.wait_for(client.rendered.wait(), 30)
+            except asyncio.TimeoutError:
+                pass
+
+    t = time.perf_counter()
+    await asyncio.gather(*[open_client(client) for client in clients])
+    connect_duration = time.perf_counter() - t
+    rss_connected, threads_connected = process_status(pid)
+    for client in clients:
+        client.latencies = []
+    await asyncio.sleep(TICKS + 0.5)
+
+    held = len([client for client in clients if client.open is True])
+    received = len([client for client in clients if len(client.latencies) > 0])
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    for client in clients:
+        if client.writer is not None:
+            client.writer.close()
+    for task in tasks:
+        task.cancel()
+    return {
+        "connect_s": connect_duration,
+        "held": held,
+        "received": received,
+        "threads": threads_connected - threads_before,
+        "kb_per_connection": (rss_connected - rss_before) / max(1, held) / 1024,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan"),
+    }
+
+
+def run(backend, connections):
+    server = subprocess.Popen([sys.executable, os.path.realpath(__file__), "--serve", backend], stdout=subprocess.PIPE, text=True)
+    try:
+        url = server.stdout.readline().strip()
+        while not url.startswith("http"):
+            url = server.stdout.readline().strip()
+        result = asyncio.run(load(url, server.pid, connections))
+    finally:
+        server.kill()
+        server.wait()
+    print("%-10s %12s %9s %9s %14.1f %10.1f %10.1f %10.1f" % (
+        backend, "%s/%s" % (result["held"], connections), result["received"], result["threads"],
+        result["kb_per_connection"], result["connect_s"], result["p50_ms"], result["p99_ms"]))
+
+
+if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        serve(sys.argv[sys.argv.index("--serve") + 1])
+    else:
+        raise_file_limit()
+        count = int(sys.argv[sys.argv.index("--connections") + 1]) if "--connections" in sys.argv else CONNECTIONS
+        print("%-10s %12s %9s %9s %14s %10s %10s %10s" % (
+            "backend", "held", "updated", "threads", "KB/connection", "connect s", "p50 ms", "p99 ms"))
+        for name in ("threaded", "asyncio"):
+            run(name, count)
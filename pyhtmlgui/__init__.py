@@ -1,5 +1,9 @@
 from .pyhtmlgui import PyHtmlGui
-from .lib import Observable, ObservableList, ObservableDict
+from .lib import Observable, ObservableList, ObservableDict, ObservableObject
 from .view import PyHtmlView
 from .view import ObservableDictView
 from .view import ObservableListView
+from .view import VirtualListView
+from .view import PagedListView
+from .view import PagedDictView
+from .messageCodecs import MessageCodec
@@ -0,0 +1,404 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import concurrent.futures
+import hashlib
+import http.client
+import http.cookies
+import io
+import logging
+import socket
+import sys
+import threading
+import typing
+import urllib.parse
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pyhtmlgui.pyhtmlgui import PyHtmlGui
+    from pyhtmlgui.pyhtmlguiInstance import PyHtmlGuiInstance
+from .pyhtmlguiInstance import WebsocketConnection
+from .messageCodecs import MessageCodec
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUATION, OPCODE_TEXT, OPCODE_BINARY, OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+MAX_BODY_SIZE = 16 * 1024 * 1024  # of http requests
+MAX_PENDING_MESSAGES = 1000  # received messages per connection waiting for the previous one, reading waits while full
+WRITE_BUFFER_LIMIT = 256 * 1024  # wait for the socket to drain if more bytes are buffered
+
+
+class AsyncioServerThread(threading.Thread):
+    """
+    Serves "/", "/static" and "/ws" on a single asyncio event loop, instead of one thread per request and two per websocket.
+    Http requests are passed to the flask app in a worker thread, websockets are handled on the loop.
+    Received messages are processed in a pool of worker threads, so views still render and block like with the threaded server.
+    """
+    def __init__(self, gui: PyHtmlGui, app, host: str, port: int, worker_threads: int = None):
+        threading.Thread.__init__(self, daemon=True)
+        self.gui = gui
+        self.app = app
+        self.socket = create_server_socket(host, port, backlog=1024)
+        self.loop = asyncio.new_event_loop()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix="pyhtmlgui")
+        self._server = None
+
+    def get_port(self):
+        return self.socket.getsockname()[1]
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self.executor)
+        self._server = self.loop.run_until_complete(asyncio.start_server(self._handle_client, sock=self.socket, backlog=1024))
+        try:
+            self.loop.run_forever()
+        finally:
+            self._server.close()
+            self.executor.shutdown(wait=False)
+
+    def shutdown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers = request
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self._handle_websocket(reader, writer, target, headers)
+                    break
+                status, content_length = self._check_body(headers)
+                if status is not None:
+                    self._write_response(writer, "%s %s" % (status, http.client.responses[status]), [], b"", False)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(content_length)
+                environ = self._create_environ(writer, method, target, version, headers, body)
+                status, response_headers, body = await self.loop.run_in_executor(self.executor, self._call_app, environ)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, response_headers, body, keep_alive)
+                await writer.drain()
+                if keep_alive is False:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        except Exception as e:
+            logging.error("Failed to handle request, %s" % e)
+        finally:
+            try:
+                writer.close()
+            except:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> typing.Union[tuple, None]:
+        try:
+            data = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None  # client closed keep alive connection
+        lines = data.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                name = name.strip().lower()
+                headers[name] = "%s, %s" % (headers[name], value.strip()) if name in headers else value.strip()
+        return method, target, version, headers
+
+    @staticmethod
+    def _check_body(headers: dict) -> tuple:
+        """
+        Return (error status, None) if the request body can't be read, else (None, length of request body).
+        Bodies are only delimited by content-length, a chunked body would be read as the next request of the connection
+        """
+        if "transfer-encoding" in headers:
+            return (400 if "content-length" in headers else 501), None
+        value = headers.get("content-length", "0").strip()
+        if value.isdigit() is False:  # also rejects negative values and lists of values
+            return 400, None
+        if int(value) > MAX_BODY_SIZE:
+            return 413, None
+        return None, int(value)
+
+    def _create_environ(self, writer: asyncio.StreamWriter, method: str, target: str, version: str, headers: dict, body: bytes) -> dict:
+        path, _, query = target.partition("?")
+        server_name, server_port = self.socket.getsockname()[:2]
+        peer = writer.get_extra_info("peername") or ("", 0)
+        environ = {
+            "REQUEST_METHOD"   : method,
+            "SCRIPT_NAME"      : "",
+            "PATH_INFO"        : urllib.parse.unquote_to_bytes(path).decode("latin-1"),
+            "QUERY_STRING"     : query,
+            "SERVER_NAME"      : server_name,
+            "SERVER_PORT"      : str(server_port),
+            "SERVER_PROTOCOL"  : version,
+            "REMOTE_ADDR"      : peer[0],
+            "REMOTE_PORT"      : str(peer[1]),
+            "wsgi.version"     : (1, 0),
+            "wsgi.url_scheme"  : "http",
+            "wsgi.input"       : io.BytesIO(body),
+            "wsgi.errors"      : sys.stderr,
+            "wsgi.multithread" : True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once"    : False,
+        }
+        for name, value in headers.items():
+            if name == "content-type":
+                environ["CONTENT_TYPE"] = value
+            elif name == "content-length":
+                environ["CONTENT_LENGTH"] = value
+            else:
+                environ["HTTP_%s" % name.upper().replace("-", "_")] = value
+        return environ
+
+    def _call_app(self, environ: dict) -> tuple:
+        response = []
+
+        def start_response(status, headers, exc_info=None):
+            response[:] = [status, headers]
+
+        result = self.app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response[0], response[1], body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: str, headers: list, body: bytes, keep_alive: bool) -> None:
+        lines = ["HTTP/1.1 %s" % status]
+        lines.extend("%s: %s" % (name, value) for name, value in headers if name.lower() not in ("connection", "content-length"))
+        lines.append("Content-Length: %s" % len(body))
+        lines.append("Connection: %s" % ("keep-alive" if keep_alive is True else "close"))
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    async def _handle_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str, headers: dict) -> None:
+        path, _, query = target.partition("?")
+        key = headers.get("sec-websocket-key")
+        if path != "/ws" or key is None:
+            self._write_response(writer, "%s %s" % (404, http.client.responses[404]), [], b"", False)
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode("latin-1") + WEBSOCKET_GUID).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      "Sec-WebSocket-Accept: %s\r\n\r\n" % accept).encode("latin-1"))
+
+        cookies = {name: morsel.value for name, morsel in http.cookies.SimpleCookie(headers.get("cookie", "")).items()}
+        args = {name: values[0] for name, values in urllib.parse.parse_qs(query).items()}
+        msg = self.gui._check_websocket_request(cookies, args)
+        if msg is not None:
+            writer.write(encode_frame(OPCODE_CLOSE, (1000).to_bytes(2, "big") + msg.encode()))
+            await writer.drain()
+            return
+
+        endpoint = self.gui._endpoints[cookies.get("endpoint", "")]
+        instance = await self.loop.run_in_executor(self.executor, endpoint._get_instance)
+        codec = self.gui._select_message_codec(args)
+        connection = AsyncioWebsocketConnection(reader, writer, self.loop, self.executor, instance, self.gui.send_queue_size, self.gui.backpressure, codec)
+        instance._add_connection(connection)
+        try:
+            await connection.run()
+        finally:
+            try:
+                await self.loop.run_in_executor(self.executor, self._release_connection, endpoint, instance, connection)
+            except RuntimeError:
+                pass  # executor was shut down with the server
+
+    @staticmethod
+    def _release_connection(endpoint, instance: PyHtmlGuiInstance, connection: AsyncioWebsocketConnection) -> None:
+        instance._remove_connection(connection)
+        endpoint._release_instance(instance)
+
+
+class AsyncioWebsocketConnection(WebsocketConnection):
+    """
+    Websocket connection without threads of its own, frames are read and written on the event loop.
+    send() may be called from any thread, it queues the message and wakes up the writer task.
+    Results of javascript calls are processed on the loop as soon as they are read, so handlers waiting for them are
+    released even if all worker threads are busy, or if the handler was called by this connection.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop,
+                 executor: concurrent.futures.Executor, pyHtmlGuiInstance, send_queue_size: int = 1000, backpressure: str = "block",
+                 codec: MessageCodec = None):
+        self._reader = reader
+        self._writer = writer
+        self._loop = loop
+        self._executor = executor
+        self._wakeup = asyncio.Event()
+        self._wakeup_pending = False
+        self._loop_thread_id = threading.get_ident()  # created on the loop
+        self._close_code = 1000  # sent in the close frame, set on protocol errors of the client
+        self._received = asyncio.Queue(MAX_PENDING_MESSAGES)  # decoded messages other than results
+        super().__init__(None, pyHtmlGuiInstance, send_queue_size, backpressure, codec)
+
+    def _start_send_loop(self):
+        pass  # the writer task is started by run()
+
+    async def run(self) -> None:
+        """
+        Process received messages until the connection is closed
+        """
+        send_task = self._loop.create_task(self._send_loop_async())
+        dispatch_task = self._loop.create_task(self._dispatch_loop_async())
+        try:
+            await self._receive_loop_async()
+        finally:
+            self.close()
+            dispatch_task.cancel()  # a handler still running in a worker thread finishes there
+            await send_task
+
+    async def _receive_loop_async(self) -> None:
+        while self.active is True:
+            try:
+                msg = await self._read_message()
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                msg = None
+            if msg is None:
+                break
+            try:
+                message = self.codec.decode(msg)
+            except:
+                continue
+            if "return" in message:  # only completes a JavascriptCallResult, callbacks run in a worker thread
+                self._process_received_message(message)
+            else:
+                await self._received.put(message)
+
+    async def _dispatch_loop_async(self) -> None:
+        while True:
+            message = await self._received.get()
+            # one message at a time, like the threaded server, so handlers of a connection run in order
+            await self._loop.run_in_executor(self._executor, self._process_received_message, message)
+
+    def _run_result_callback(self, callback: typing.Callable, results: list) -> None:
+        self._executor.submit(callback, results)  # may block, not on the loop
+
+    async def _read_message(self) -> typing.Union[str, bytes, None]:
+        fragments = []
+        message_opcode = OPCODE_TEXT
+        while True:
+            head = await self._reader.readexactly(2)
+            fin, opcode = head[0] & 0x80, head[0] & 0x0F
+            length = head[1] & 0x7F
+            if length == 126:
+                length = int.from_bytes(await self._reader.readexactly(2), "big")
+            elif length == 127:
+                length = int.from_bytes(await self._reader.readexactly(8), "big")
+            if length + sum(len(f) for f in fragments) > MAX_MESSAGE_SIZE:
+                self._close_code = 1009
+                raise ValueError("Websocket message too large")
+            if head[1] & 0x80 == 0:  # clients must mask all frames, RFC 6455 5.1
+                self._close_code = 1002
+                raise ValueError("Websocket frame is not masked")
+            mask = await self._reader.readexactly(4)
+            payload = unmask(await self._reader.readexactly(length), mask)
+
+            if opcode == OPCODE_CLOSE:
+                return None  # the writer task answers with a close frame
+            if opcode == OPCODE_PING:
+                self._writer.write(encode_frame(OPCODE_PONG, payload))
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode != OPCODE_CONTINUATION:
+                message_opcode = opcode
+                fragments = []
+            fragments.append(payload)
+            if fin:
+                data = b"".join(fragments)
+                return data.decode() if message_opcode == OPCODE_TEXT else data
+
+    async def _send_loop_async(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            self._wakeup_pending = False  # cleared before reading the queue, so a later send() wakes us again
+            send_queue = self.send_queue
+            while send_queue is not None:
+                message = send_queue.get(block=False)
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    self._writer.write(encode_frame(OPCODE_TEXT, message.encode()))
+                else:
+                    self._writer.write(encode_frame(OPCODE_BINARY, message))
+                if self._writer.transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                    await self._drain()
+            await self._drain()
+            if self.active is False:
+                break
+        try:
+            self._writer.write(encode_frame(OPCODE_CLOSE, self._close_code.to_bytes(2, "big")))
+            await self._writer.drain()
+            self._writer.close()
+        except:
+            pass
+        self.send_queue = None
+
+    async def _drain(self) -> None:
+        try:
+            await self._writer.drain()
+        except ConnectionError:
+            self.active = False
+
+    def send(self, message, key=None, droppable: bool = False, lane: str = "normal", targets: frozenset = None, scope: frozenset = None):
+        if self.backpressure == "block" and self._loop_thread_id == threading.get_ident():
+            # called from a coroutine, waiting for the writer task here would block the loop forever
+            send_queue = self.send_queue
+            if send_queue is not None and send_queue.put(message, key, droppable, block=False, lane=lane, targets=targets, scope=scope) is False:
+                self._loop.run_in_executor(self._executor, lambda: self.send(message, key, droppable, lane, targets, scope))
+        else:
+            super().send(message, key, droppable, lane, targets, scope)
+        self._wake_writer()
+
+    def close(self):
+        self.active = False
+        send_queue = self.send_queue
+        if send_queue is not None:
+            send_queue.close()
+        self._wake_writer()
+
+    def _wake_writer(self) -> None:
+        if self._wakeup_pending is False:
+            self._wakeup_pending = True
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass  # event loop is closed
+
+
+def encode_frame(opcode: int, payload: bytes) -> bytes:
+    length = len(payload)
+    if length < 126:
+        head = bytes((0x80 | opcode, length))
+    elif length < 65536:
+        head = bytes((0x80 | opcode, 126)) + length.to_bytes(2, "big")
+    else:
+        head = bytes((0x80 | opcode, 127)) + length.to_bytes(8, "big")
+    return head + payload
+
+
+def create_server_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """
+    Listening tcp socket like socket.create_server(), which needs python 3.8
+    """
+    family, socket_type, proto, canonname, address = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM, 0, socket.AI_PASSIVE)[0]
+    sock = socket.socket(family, socket_type, proto)
+    try:
+        if sys.platform != "win32":
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(address)
+        sock.listen(backlog)
+    except:
+        sock.close()
+        raise
+    return sock
+
+
+def unmask(payload: bytes, mask: bytes) -> bytes:
+    length = len(payload)
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
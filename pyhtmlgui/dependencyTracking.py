@@ -0,0 +1,72 @@
+import threading
+import jinja2
+from .lib import Observable, ObservableList, ObservableDict
+
+_local = threading.local()
+
+
+class DependencyRecorder:
+    """
+    Observables and their attributes read by a template while it renders
+    """
+    def __init__(self):
+        self.dependencies = {}  # id of observable -> [observable, set of attribute names or None if it depends on everything]
+
+    def record(self, observable: Observable, attribute: str = None) -> None:
+        try:
+            dependency = self.dependencies[id(observable)]
+        except KeyError:
+            self.dependencies[id(observable)] = [observable, None if attribute is None else {attribute}]
+            return
+        if dependency[1] is not None:
+            if attribute is None:
+                dependency[1] = None
+            else:
+                dependency[1].add(attribute)
+
+
+def start_recording() -> DependencyRecorder:
+    """
+    Record reads of templates rendered by DependencyTrackingEnvironment in this thread, until stop_recording() is called.
+    Recordings can be nested, reads are recorded by the innermost recorder.
+    """
+    recorder = DependencyRecorder()
+    try:
+        _local.recorders.append(recorder)
+    except AttributeError:
+        _local.recorders = [recorder]
+    return recorder
+
+
+def stop_recording(recorder: DependencyRecorder) -> None:
+    _local.recorders.remove(recorder)
+
+
+class DependencyTrackingEnvironment(jinja2.Environment):
+    """
+    Jinja environment that reports attribute and item access on observables to the current DependencyRecorder
+    """
+    def getattr(self, obj, attribute):
+        value = super().getattr(obj, attribute)
+        if isinstance(obj, Observable):
+            self._record(obj, value, attribute)
+        return value
+
+    def getitem(self, obj, argument):
+        value = super().getitem(obj, argument)
+        if isinstance(obj, Observable):
+            self._record(obj, value, None)
+        return value
+
+    @staticmethod
+    def _record(obj, value, attribute):
+        try:
+            recorder = _local.recorders[-1]
+        except (AttributeError, IndexError):
+            return
+        if attribute is None or callable(value) or isinstance(obj, (ObservableList, ObservableDict)):
+            recorder.record(obj)  # result may depend on anything in obj
+        else:
+            recorder.record(obj, attribute)
+        if isinstance(value, (ObservableList, ObservableDict)):  # iterated by the template
+            recorder.record(value)
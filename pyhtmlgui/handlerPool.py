@@ -0,0 +1,113 @@
+from __future__ import annotations
+import time
+import logging
+import threading
+import traceback
+import collections
+import typing
+
+
+class HandlerPool:
+    """
+    Runs python functions called from the frontend in a fixed number of worker threads, so a slow handler doesn't stop
+    the connection from receiving further messages.
+    Tasks with the same ordering key run one after another in the order they were submitted,
+    tasks with different keys or without key run in parallel.
+    """
+    def __init__(self, threads: int = 8, max_queued: int = 1000):
+        """
+        :param threads: Number of worker threads
+        :param max_queued: Max number of tasks waiting to run, submit() blocks until there is space
+        """
+        if threads < 1:
+            raise Exception("Handler pool needs at least one thread, got %s" % threads)
+        if max_queued < 1:
+            raise Exception("Handler pool needs a queue size of at least 1, got %s" % max_queued)
+        self.threads = threads
+        self.max_queued = max_queued
+        self._ready = collections.deque()  # tasks that can run now
+        self._waiting = {}  # ordering key of a task that is queued or running -> deque of later tasks with this key
+        self._queued = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._stats = {"completed": 0, "max_queued": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0}
+        self._handler_stats = collections.defaultdict(lambda: {"calls": 0, "ms_total": 0.0, "ms_max": 0.0})
+        for i in range(threads):
+            threading.Thread(target=self._worker, name="pyhtmlgui-handler-%s" % i, daemon=True).start()
+
+    def submit(self, name: str, function: typing.Callable, key: typing.Hashable = None) -> None:
+        """
+        Queue function to run in a worker thread
+        :param name: Handler name for statistics
+        :param key: Ordering key, None if the task may run in parallel to all other tasks
+        """
+        with self._condition:
+            while self._queued >= self.max_queued:
+                self._condition.wait()
+            task = (key, name, function, time.perf_counter())
+            self._queued += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._queued)
+            if key is not None and key in self._waiting:
+                self._waiting[key].append(task)  # runs when the previous task with this key is finished
+            else:
+                if key is not None:
+                    self._waiting[key] = collections.deque()
+                self._ready.append(task)
+                self._condition.notify_all()
+
+    def _worker(self) -> None:
+        while True:
+            with self._condition:
+                while len(self._ready) == 0:
+                    self._condition.wait()
+                key, name, function, queued_at = self._ready.popleft()
+                self._queued -= 1
+                self._running += 1
+                self._condition.notify_all()
+            started = time.perf_counter()
+            try:
+                function()
+            except Exception:
+                logging.error("Exception in handler %s: %s" % (name, traceback.format_exc()))
+            finished = time.perf_counter()
+
+            with self._condition:
+                self._running -= 1
+                self._record(name, (started - queued_at) * 1000, (finished - started) * 1000)
+                if key is not None:
+                    waiting = self._waiting[key]
+                    if len(waiting) > 0:
+                        self._ready.append(waiting.popleft())
+                        self._condition.notify_all()
+                    else:
+                        del self._waiting[key]
+
+    def _record(self, name: str, wait_ms: float, run_ms: float) -> None:
+        self._stats["completed"] += 1
+        self._stats["wait_ms_total"] += wait_ms
+        self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+        handler_stats = self._handler_stats[name]
+        handler_stats["calls"] += 1
+        handler_stats["ms_total"] += run_ms
+        handler_stats["ms_max"] = max(handler_stats["ms_max"], run_ms)
+
+    def get_stats(self) -> dict:
+        """
+        Queue depth, time tasks waited in the queue, and run time by handler name, in milliseconds
+        """
+        with self._condition:
+            completed = self._stats["completed"]
+            return {
+                "threads"    : self.threads,
+                "queued"     : self._queued,
+                "running"    : self._running,
+                "max_queued" : self._stats["max_queued"],
+                "completed"  : completed,
+                "wait_ms_avg": self._stats["wait_ms_total"] / completed if completed > 0 else 0.0,
+                "wait_ms_max": self._stats["wait_ms_max"],
+                "handlers"   : {name: {
+                    "calls" : s["calls"],
+                    "ms_avg": s["ms_total"] / s["calls"],
+                    "ms_max": s["ms_max"],
+                } for name, s in self._handler_stats.items()},
+            }
@@ -2,3 +2,4 @@ from .weakFunctionReferences import WeakFunctionReferences
 from .observable import Observable
 from .observableDict import ObservableDict
 from .observableList import ObservableList
+from .observableObject import ObservableObject
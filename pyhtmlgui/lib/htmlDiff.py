@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import html
+import re
+import threading
+import typing
+
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+RAW_TEXT_ELEMENTS = {"script", "style"}
+# start tags that implicitly close an open element of the given type, like the browsers parser does
+IMPLIED_END_TAGS = {
+    "li"    : {"li"},
+    "option": {"option"},
+    "tr"    : {"tr", "td", "th"},
+    "td"    : {"td", "th"},
+    "th"    : {"td", "th"},
+    "p"     : {"p"},
+    "div"   : {"p"},
+    "ul"    : {"p"},
+    "ol"    : {"p"},
+    "table" : {"p"},
+}
+
+TEXT_NODE = "#text"
+COMMENT_NODE = "#comment"
+
+
+class HtmlNode:
+    __slots__ = ("tag", "attrs", "children", "text", "parent", "key", "source")
+
+    def __init__(self, tag: str, attrs: dict = None, text: str = None) -> None:
+        self.tag = tag
+        self.attrs = attrs if attrs is not None else {}
+        self.children = []
+        self.text = text
+        self.parent = None
+        self.key = self.attrs.get("id")
+        self.source = None  # original html of this element, used to skip unchanged subtrees while diffing
+
+    def set_attrs(self, attrs: dict) -> None:
+        self.attrs = attrs
+        self.key = attrs.get("id")
+
+    def invalidate_source(self) -> None:
+        node = self
+        while node is not None:
+            node.source = None
+            node = node.parent
+
+    def append(self, child: HtmlNode) -> None:
+        child.parent = self
+        self.children.append(child)
+
+    def element_children(self) -> list:
+        return [c for c in self.children if c.tag != TEXT_NODE and c.tag != COMMENT_NODE]
+
+    def to_html(self) -> str:
+        if self.tag == TEXT_NODE:
+            if self.parent is not None and self.parent.tag in RAW_TEXT_ELEMENTS:
+                return self.text
+            return html.escape(self.text, quote=False)
+        if self.tag == COMMENT_NODE:
+            return "<!--%s-->" % self.text
+        attrs = "".join([' %s="%s"' % (k, html.escape(v, quote=True)) if v is not None else " %s" % k for k, v in self.attrs.items()])
+        if self.tag in VOID_ELEMENTS:
+            return "<%s%s>" % (self.tag, attrs)
+        return "<%s%s>%s</%s>" % (self.tag, attrs, "".join([c.to_html() for c in self.children]), self.tag)
+
+
+TOKEN_RE = re.compile(r'<!--(.*?)-->|<(/?)([a-zA-Z][^\s/>]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>|<!([^>]*)>', re.DOTALL)
+ATTRIBUTE_RE = re.compile(r'([^\s=/>"\']+)(?:\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+)))?')
+
+
+def parse_html(content: str, reference: HtmlNode = None, known: dict = None) -> HtmlNode:
+    """
+    Parse html into a lightweight node tree that follows the browsers dom structure closely enough to address nodes by child index.
+    Returns the fragment root, the parsed nodes are its children.
+    If a previously parsed reference tree for the same content position is given, unchanged elements are reused from it
+    instead of being parsed again, keyed elements are looked up in known.
+    """
+    content = str(content)  # slicing markup objects is slow
+    root = HtmlNode("#fragment")
+    stack = [root]
+    starts = [None]
+    refs = [reference]
+    reused = set()
+    position = 0
+    length = len(content)
+    while position < length:
+        match = TOKEN_RE.search(content, position)
+        end = match.start() if match is not None else length
+        if end > position:
+            _add_text(stack[-1], content[position:end], True)
+        if match is None:
+            break
+        position = match.end()
+        if match.group(1) is not None:
+            stack[-1].append(HtmlNode(COMMENT_NODE, text=match.group(1)))
+        elif match.group(3) is not None:
+            tag = match.group(3).lower()
+            if match.group(2) == "/":
+                for i in range(len(stack) - 1, 0, -1):
+                    if stack[i].tag == tag:
+                        if i == len(stack) - 1 and starts[i] is not None:  # properly closed, remember source for fast compare
+                            stack[i].source = content[starts[i]:position]
+                        del stack[i:]
+                        del starts[i:]
+                        del refs[i:]
+                        break
+                continue
+            closes = IMPLIED_END_TAGS.get(tag)
+            if closes is not None and stack[-1].tag in closes:
+                stack.pop()
+                starts.pop()
+                refs.pop()
+            if tag == "tr" and stack[-1].tag == "table":  # browsers insert an implicit tbody
+                tbody = HtmlNode("tbody")
+                refs.append(_reference_child(refs[-1], len(stack[-1].children), "tbody"))
+                stack[-1].append(tbody)
+                stack.append(tbody)
+                starts.append(None)
+
+            positional = _reference_child(refs[-1], len(stack[-1].children), tag)
+            candidate = positional
+            attributes = match.group(4)
+            attrs = None
+            if (candidate is None or candidate.source is None or not content.startswith(candidate.source, match.start())) and known is not None:
+                attrs = _parse_attributes(attributes) if attributes.strip("/ \t\r\n") != "" else {}
+                candidate = known.get(attrs.get("id"))
+                if candidate is not None and not _is_descendant(candidate, reference):
+                    candidate = None
+            if candidate is not None and candidate.tag == tag and candidate.source is not None and \
+                    id(candidate) not in reused and content.startswith(candidate.source, match.start()):
+                reused.add(id(candidate))
+                stack[-1].children.append(candidate)  # unchanged, parent is fixed when the tree is registered
+                position = match.start() + len(candidate.source)
+                continue
+            if attrs is None:
+                attrs = _parse_attributes(attributes) if attributes.strip("/ \t\r\n") != "" else {}
+            node = HtmlNode(tag, attrs)
+            stack[-1].append(node)
+            if tag in RAW_TEXT_ELEMENTS:
+                close = re.compile(r'</%s\s*>' % tag, re.IGNORECASE).search(content, position)
+                raw_end = close.start() if close is not None else length
+                if raw_end > position:
+                    _add_text(node, content[position:raw_end], False)
+                position = close.end() if close is not None else length
+                node.source = content[match.start():position]
+            elif tag not in VOID_ELEMENTS:
+                stack.append(node)
+                starts.append(match.start())
+                if candidate is None or candidate.tag != tag:
+                    candidate = positional
+                refs.append(candidate)
+            else:
+                node.source = match.group(0)
+    return root
+
+
+def _is_descendant(node: HtmlNode, reference: HtmlNode) -> bool:
+    while node is not None:
+        if any([node is c for c in reference.children]):
+            return True
+        node = node.parent
+    return False
+
+
+def _reference_child(reference: typing.Union[HtmlNode, None], index: int, tag: str) -> typing.Union[HtmlNode, None]:
+    if reference is None or index >= len(reference.children):
+        return None
+    child = reference.children[index]
+    return child if child.tag == tag else None
+
+
+def _add_text(parent: HtmlNode, text: str, unescape: bool) -> None:
+    if unescape is True and "&" in text:
+        text = html.unescape(text)
+    if len(parent.children) > 0 and parent.children[-1].tag == TEXT_NODE:
+        parent.children[-1].text += text
+    else:
+        parent.append(HtmlNode(TEXT_NODE, text=text))
+
+
+def _parse_attributes(attributes: str) -> dict:
+    result = {}
+    for match in ATTRIBUTE_RE.finditer(attributes):
+        name = match.group(1).lower()
+        if name in result:  # browsers keep the first value
+            continue
+        value = match.group(2)
+        if value is None:
+            value = match.group(3)
+        if value is None:
+            value = match.group(4)
+        if value is not None and "&" in value:
+            value = html.unescape(value)
+        result[name] = value
+    return result
+
+
+def diff_nodes(old: HtmlNode, new: HtmlNode, path: list = None, ops: list = None) -> list:
+    """
+    Create a list of patch operations that transform old into new. old and new must be elements of the same tag.
+    Operations are applied in order by pyhtmlgui.patch_element, paths are childNode indices relative to the patched element.
+        ["a", path, name, value]    set attribute, remove if value is None
+        ["t", path, text]           set text or comment content
+        ["i", path, index, html]    insert node before childNodes[index]
+        ["r", path, index]          remove childNodes[index]
+        ["m", path, from, to]       move childNodes[from] to position to
+        ["x", path, html]           replace node
+    """
+    if path is None:
+        path = []
+    if ops is None:
+        ops = []
+    if old.source is not None and old.source == new.source:
+        return ops
+
+    for name, value in new.attrs.items():
+        if old.attrs.get(name, False) != value:
+            ops.append(["a", path, name, value if value is not None else ""])
+    for name in old.attrs:
+        if name not in new.attrs:
+            ops.append(["a", path, name, None])
+
+    current = list(old.children)
+    new_keys = set([c.key for c in new.children if c.key is not None])
+    i = 0
+    while i < len(new.children):
+        new_child = new.children[i]
+        if i < len(current) and _is_same_node(current[i], new_child):
+            _diff_child(current[i], new_child, path + [i], ops)
+            i += 1
+            continue
+        if new_child.key is not None:
+            index = _find_keyed(current, new_child, i + 1)
+            if index is not None:
+                ops.append(["m", path, index, i])
+                current.insert(i, current.pop(index))
+                _diff_child(current[i], new_child, path + [i], ops)
+                i += 1
+                continue
+        if i < len(current) and current[i].key is not None and current[i].key not in new_keys:
+            ops.append(["r", path, i])  # keyed node that no longer exists
+            del current[i]
+            continue
+        if i < len(current) and current[i].key is None and new_child.key is None:
+            ops.append(["x", path + [i], new_child.to_html()])
+            current[i] = new_child
+            i += 1
+            continue
+        ops.append(["i", path, i, new_child.to_html()])
+        current.insert(i, new_child)
+        i += 1
+
+    for index in range(len(current) - 1, len(new.children) - 1, -1):
+        ops.append(["r", path, index])
+    return ops
+
+
+def _is_same_node(old: HtmlNode, new: HtmlNode) -> bool:
+    return old.tag == new.tag and old.key == new.key
+
+
+def _find_keyed(nodes: list, node: HtmlNode, start: int) -> typing.Union[int, None]:
+    for index in range(start, len(nodes)):
+        if nodes[index].key == node.key and nodes[index].tag == node.tag:
+            return index
+    return None
+
+
+def _diff_child(old: HtmlNode, new: HtmlNode, path: list, ops: list) -> None:
+    if old.tag == TEXT_NODE or old.tag == COMMENT_NODE:
+        if old.text != new.text:
+            ops.append(["t", path, new.text])
+    elif old.tag in RAW_TEXT_ELEMENTS:
+        if old.source is None or old.source != new.source:  # changed scripts must be replaced to be executed again
+            ops.append(["x", path, new.to_html()])
+    else:
+        diff_nodes(old, new, path, ops)
+
+
+class DomMirror:
+    """
+    Server side copy of the frontend dom, maintained from the javascript calls that modify it.
+    This allows PyHtmlView.update() to send patches instead of fully rendered elements.
+    """
+    def __init__(self) -> None:
+        self._nodes = {}
+        self._lock = threading.Lock()
+
+    def apply_call(self, js_function_name: str, args: list) -> None:
+        try:
+            with self._lock:
+                if js_function_name == "pyhtmlgui.replace_element":
+                    self._replace(args[0], args[1])
+                elif js_function_name == "pyhtmlgui.update_element":
+                    self._set_content(args[0], args[1])
+                elif js_function_name == "pyhtmlgui.insert_element":
+                    self._insert(args[0], args[1], args[2])
+                elif js_function_name == "pyhtmlgui.insert_elements":
+                    for offset, content in enumerate(args[2]):
+                        self._insert(args[0], args[1] + offset, content)
+                elif js_function_name == "pyhtmlgui.move_element":
+                    self._move(args[0], args[1], args[2])
+                elif js_function_name == "pyhtmlgui.remove_element":
+                    self._remove(args[0])
+        except Exception:  # if the mirror can't follow, the element is forgotten and fully replaced next time
+            self.forget(args[0])
+
+    def diff(self, uid: str, content: str) -> typing.Union[list, None]:
+        """
+        Create patch operations for element uid and update the mirror to the new content.
+        Returns None if the element is unknown and must be replaced.
+        """
+        with self._lock:
+            old = self._nodes.get(uid)
+            if old is None:
+                return None
+            new = self._parse_element(content, old)
+            if new is None or new.tag != old.tag:
+                return None
+            if new is old:
+                return []
+            ops = diff_nodes(old, new)
+            if len(ops) == 0:
+                return ops
+            self._unregister(old)
+            old.invalidate_source()
+            old.set_attrs(new.attrs)
+            old.source = new.source
+            old.children = []
+            for child in new.children:
+                old.append(child)
+            self._register(old)
+            return ops
+
+    def forget(self, uid: str) -> None:
+        node = self._nodes.pop(uid, None)
+        if node is not None:
+            self._unregister(node)
+
+    def _parse_element(self, content: str, reference: HtmlNode = None) -> typing.Union[HtmlNode, None]:
+        if reference is not None:
+            fragment = HtmlNode("#fragment")
+            fragment.children.append(reference)  # keep reference.parent, it is still part of the mirrored dom
+            children = parse_html(content.strip(), fragment, self._nodes).children
+        else:
+            children = parse_html(content.strip()).children
+        if len(children) == 0 or children[0].tag in (TEXT_NODE, COMMENT_NODE):
+            return None
+        return children[0]
+
+    def _replace(self, uid: str, content: str) -> None:
+        old = self._nodes.get(uid)
+        new = self._parse_element(content)
+        if old is None or old.parent is None or new is None:
+            self.forget(uid)
+            return
+        self._unregister(old)
+        old.parent.invalidate_source()
+        siblings = old.parent.children
+        siblings[siblings.index(old)] = new
+        new.parent = old.parent
+        self._register(new)
+
+    def _set_content(self, uid: str, content: str) -> None:
+        node = self._nodes.get(uid)
+        if node is None:
+            node = HtmlNode("body", {"id": uid})
+        self._unregister(node)
+        node.invalidate_source()
+        node.children = []
+        for child in parse_html(content).children:
+            node.append(child)
+        self._register(node)
+
+    def _insert(self, parent_uid: str, index: int, content: str) -> None:
+        parent = self._nodes.get(parent_uid)
+        new = self._parse_element(content)
+        if parent is None or new is None:
+            return
+        parent.invalidate_source()
+        elements = parent.element_children()
+        new.parent = parent
+        if index < len(elements):
+            parent.children.insert(parent.children.index(elements[index]), new)
+        else:
+            parent.children.append(new)
+        self._register(new)
+
+    def _move(self, parent_uid: str, index: int, child_uid: str) -> None:
+        parent = self._nodes.get(parent_uid)
+        child = self._nodes.get(child_uid)
+        if parent is None or child is None:
+            return
+        parent.invalidate_source()
+        parent.children.remove(child)
+        elements = parent.element_children()
+        if index < len(elements):
+            parent.children.insert(parent.children.index(elements[index]), child)
+        else:
+            parent.children.append(child)
+        child.parent = parent
+
+    def _remove(self, uid: str) -> None:
+        node = self._nodes.get(uid)
+        if node is None:
+            return
+        if node.parent is not None:
+            node.parent.invalidate_source()
+            node.parent.children.remove(node)
+        self._unregister(node)
+
+    def _register(self, node: HtmlNode) -> None:
+        if node.key is not None:
+            self._nodes[node.key] = node
+        for child in node.children:
+            child.parent = node
+            if child.tag != TEXT_NODE and child.tag != COMMENT_NODE:
+                self._register(child)
+
+    def _unregister(self, node: HtmlNode) -> None:
+        if node.key is not None and self._nodes.get(node.key) is node:
+            del self._nodes[node.key]
+        for child in node.children:
+            if child.tag != TEXT_NODE and child.tag != COMMENT_NODE:
+                self._unregister(child)
@@ -1,20 +1,113 @@
 import typing
-from .weakFunctionReferences import WeakFunctionReferences
+import weakref
+import contextlib
+import threading
+
+_observers_lock = threading.Lock()
 
 
 class Observable:
+    _observer_entries = ()  # (weak reference to object, function, function takes source), replaced on change, never modified
+    _dead_observers = False  # entries of observers that died are removed on the next attach or detach
+    _batch_depth = 0
+
     def __init__(self):
-        self._observers = WeakFunctionReferences()
+        self._observer_entries = ()
 
     def attach_observer(self, target_function: typing.Callable) -> None:
-        self._observers.add(target_function)
+        """
+        :param target_function: Bound method, called as target_function(source, **kwargs) if it takes arguments, else as target_function()
+        """
+        obj, function = target_function.__self__, target_function.__func__
+        # created before taking the lock, the gc may run while allocating and call death callbacks of other observers
+        entry = (weakref.ref(obj, _observer_died_callback(self)), function, function.__code__.co_argcount > 1)
+        with _observers_lock:
+            entries = self._get_live_entries()
+            for obj_ref, f, pass_source in entries:
+                if f is function and obj_ref() is obj:  # already attached
+                    self._observer_entries = entries
+                    return
+            self._observer_entries = entries + (entry,)
 
     def detach_observer(self, target_function: typing.Callable) -> None:
-        self._observers.remove(target_function)
+        obj, function = target_function.__self__, target_function.__func__
+        with _observers_lock:
+            entries = self._get_live_entries()
+            remaining = tuple(e for e in entries if e[1] is not function or e[0]() is not obj)
+            self._observer_entries = remaining
+            if len(remaining) == len(entries):
+                raise KeyError("observer is not attached")
+
+    def _get_live_entries(self) -> tuple:
+        """
+        Observer entries without those of dead observers, must be called with _observers_lock held
+        """
+        if self._dead_observers is False:
+            return self._observer_entries
+        self._dead_observers = False  # reset first, observers that die while we filter set it again
+        return tuple(e for e in self._observer_entries if e[0]() is not None)
+
+    def _on_observer_died(self, obj_ref: weakref.ref) -> None:
+        """
+        Called by the gc at any point, possibly while this thread holds _observers_lock, so never wait for it
+        """
+        self._dead_observers = True
+        if _observers_lock.acquire(blocking=False):
+            try:
+                self._observer_entries = self._get_live_entries()
+            finally:
+                _observers_lock.release()
 
     def notify_observers(self, **kwargs) -> None:
-        for target_function in self._observers.get_all():
-            if target_function.__code__.co_argcount > 1:
-                target_function(self, **kwargs)
+        if self._batch_depth > 0:
+            self._batched_notifications.append(kwargs)
+            return
+        for obj_ref, function, pass_source in self._observer_entries:
+            obj = obj_ref()
+            if obj is None:
+                continue
+            if pass_source is True:
+                function(obj, self, **kwargs)
             else:
-                target_function()
\ No newline at end of file
+                function(obj)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect notifications of changes made inside the with block, observers are notified once the outermost block ends.
+            with observable.batch():
+                ...
+        """
+        if self._batch_depth == 0:
+            self._batched_notifications = []
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                notifications, self._batched_notifications = self._batched_notifications, []
+                if len(notifications) > 0:
+                    self.notify_observers(**self._compact_notifications(notifications))
+
+    def _compact_notifications(self, notifications: list) -> dict:
+        """
+        Combine notifications collected by batch() into the kwargs of one notification
+        """
+        if len(notifications) == 1 or all(len(kwargs) == 0 for kwargs in notifications):
+            return notifications[-1]
+        return {"action": "batch", "changes": notifications}
+
+
+def _observer_died_callback(observable: Observable) -> typing.Callable:
+    """
+    Weakref callback that removes the entry of a dead observer, it only holds a weak reference to the observable,
+    so observables with observers are still freed as soon as the last reference is gone, not by the cyclic gc
+    """
+    observable_ref = weakref.ref(observable)
+
+    def callback(obj_ref: weakref.ref) -> None:
+        observable = observable_ref()
+        if observable is not None:
+            observable._on_observer_died(obj_ref)
+    return callback
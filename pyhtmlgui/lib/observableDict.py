@@ -36,3 +36,28 @@ class ObservableDict(dict, Observable):
     def clear(self):
         dict.clear(self)
         self.notify_observers(action="clear")
+
+    def _compact_notifications(self, notifications: list) -> dict:
+        """
+        Only the last change of every key is kept, all items that were set are combined into one update
+        """
+        changes = []
+        last_changes = {}  # key -> kwargs of last change, in order of first change
+        for kwargs in notifications:
+            action = kwargs.get("action")
+            if action == "clear":
+                changes, last_changes = [kwargs], {}
+            elif action == "setitem":
+                last_changes[kwargs["key"]] = kwargs
+            elif action == "update":
+                for key, item in kwargs["items"]:
+                    last_changes[key] = {"action": "setitem", "key": key, "item": item}
+            elif action in ["delitem", "pop", "popitem"]:
+                last_changes[kwargs["key"]] = kwargs
+            else:
+                changes.append(kwargs)
+        items = [[key, kwargs["item"]] for key, kwargs in last_changes.items() if kwargs["action"] == "setitem"]
+        if len(items) > 0:
+            changes.append({"action": "update", "items": items})
+        changes.extend([kwargs for kwargs in last_changes.values() if kwargs["action"] != "setitem"])
+        return super()._compact_notifications(changes)
@@ -43,7 +43,7 @@ class ObservableList(list, Observable):
     def extend(self, seq):
         insert_index = len(self)
         list.extend(self, seq)
-        self.notify_observers(action="extend", index=insert_index, items=seq)
+        self.notify_observers(action="extend", index=insert_index, items=list.__getitem__(self, slice(insert_index, None)))
 
     def pop(self, index=-1):
         removed_index = index
@@ -69,4 +69,25 @@ class ObservableList(list, Observable):
     def clear(self):
         """ Remove all items from list. """
         list.clear(self)
-        self.notify_observers(action="clear")
\ No newline at end of file
+        self.notify_observers(action="clear")
+
+    def _compact_notifications(self, notifications: list) -> dict:
+        """
+        Appends and extends at the end of the list are combined into one extend, changes before a clear are dropped
+        """
+        changes = []
+        for kwargs in notifications:
+            action = kwargs.get("action")
+            if action == "clear":
+                changes = [kwargs]
+            elif action in ["append", "extend"] and len(changes) > 0 and changes[-1].get("action") == "extend" \
+                    and kwargs["index"] == changes[-1]["index"] + len(changes[-1]["items"]):
+                changes[-1]["items"].extend([kwargs["item"]] if action == "append" else kwargs["items"])
+            elif action in ["append", "extend"]:
+                items = [kwargs["item"]] if action == "append" else list(kwargs["items"])
+                changes.append({"action": "extend", "index": kwargs["index"], "items": items})
+            else:
+                changes.append(kwargs)
+        if len(changes) == 1 and changes[0]["action"] == "extend" and len(changes[0]["items"]) == 1:
+            return notifications[-1]  # single append
+        return super()._compact_notifications(changes)
\ No newline at end of file
@@ -0,0 +1,43 @@
+import typing
+from .observable import Observable
+
+
+class ObservableObject(Observable):
+    """
+    Observable that notifies its observers when one of its NOTIFYING_ATTRIBUTES is set to a different value,
+    with action="setattr", name and value of the attribute. Views can react to specific attributes only,
+    see PyHtmlView.OBSERVED_ATTRIBUTES.
+
+        class Counter(ObservableObject):
+            NOTIFYING_ATTRIBUTES = ["value", "active"]
+    """
+    NOTIFYING_ATTRIBUTES = None  # names of attributes that notify observers, None for all attributes not starting with "_"
+
+    def __setattr__(self, name, value):
+        if self.NOTIFYING_ATTRIBUTES is None:
+            observed = name[0] != "_"
+        else:
+            observed = name in self.NOTIFYING_ATTRIBUTES
+        if observed is False:
+            object.__setattr__(self, name, value)
+            return
+        try:
+            old_value = self.__dict__[name]
+            if old_value is value or (type(old_value) == type(value) and bool(old_value == value) is True):
+                return
+        except Exception:  # not set yet or not comparable
+            pass
+        object.__setattr__(self, name, value)
+        self.notify_observers(action="setattr", name=name, value=value)
+
+
+def changes_attributes(kwargs: dict, attributes: typing.Container[str]) -> bool:
+    """
+    False if the notification with kwargs only sets attributes that are not in attributes
+    """
+    action = kwargs.get("action")
+    if action == "setattr":
+        return kwargs["name"] in attributes
+    if action == "batch":
+        return any(changes_attributes(change, attributes) for change in kwargs["changes"])
+    return True
@@ -1,28 +1,37 @@
 import typing
 import weakref
+import itertools
 
 
 class WeakFunctionReferences:
+    """
+    Registry of weakly referenced functions by unique id. Adding the same method of the same object again returns the same id,
+    entries are removed when the object dies.
+    """
     def __init__(self):
-        self.references = {}
+        self.references = {}  # callback id -> weak reference
+        self._callback_ids = {}  # (id of object, function) -> callback id
+        self._next_id = itertools.count(1)
 
-    def add(self, function: typing.Callable):
+    def add(self, function: typing.Callable) -> int:
+        key = self._get_key(function)
         try:
-            _id = id(function.__self__)
-        except:
-            _id = id(function)
-        callback_id = (_id ^ hash(function.__name__)) & 0xffffffffffff
-        if callback_id in self.references:
-            return callback_id
-        self.references[callback_id] = weakref.WeakMethod(function, self._create_delete_callback(callback_id))
+            return self._callback_ids[key]
+        except KeyError:
+            pass
+        callback_id = next(self._next_id)
+        delete_callback = self._create_delete_callback(callback_id, key)
+        try:
+            reference = weakref.WeakMethod(function, delete_callback)
+        except TypeError:  # not a bound method
+            reference = weakref.ref(function, delete_callback)
+        self.references[callback_id] = reference
+        self._callback_ids[key] = callback_id
         return callback_id
 
-    def remove(self, function: typing.Callable):
-        try:
-            _id = id(function.__self__)
-        except:
-            _id = id(function)
-        del self.references[(_id ^ hash(function.__name__)) & 0xffffffffffff]
+    def remove(self, function: typing.Callable) -> None:
+        callback_id = self._callback_ids.pop(self._get_key(function))
+        del self.references[callback_id]
 
     def get(self, callback_id: int) -> typing.Callable:
         return self.references[callback_id]()
@@ -30,11 +39,20 @@ class WeakFunctionReferences:
     def get_all(self):
         return [hr for hr in [wr() for wr in self.references.values()] if hr is not None]
 
-    def _create_delete_callback(self, callback_id: int) -> typing.Callable:
+    @staticmethod
+    def _get_key(function: typing.Callable) -> tuple:
+        try:
+            return id(function.__self__), function.__func__
+        except AttributeError:
+            return id(function), None
+
+    def _create_delete_callback(self, callback_id: int, key: tuple) -> typing.Callable:
         # noinspection PyUnusedLocal
         def f(wr):
             try:
                 del self.references[callback_id]
             except:
                 pass
+            if self._callback_ids.get(key) == callback_id:  # id of a dead object may be used again
+                del self._callback_ids[key]
         return f
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import json
+import typing
+
+
+class MessageCodec:
+    """
+    Encodes messages sent to a frontend and decodes messages received from it.
+    format is what the frontend must be able to decode, "json" text frames or "msgpack" binary frames.
+    Frontends always send json, and may receive json text frames from any codec.
+    """
+    name = "json"
+    format = "json"
+
+    def is_available(self) -> bool:
+        return True
+
+    def encode(self, message: dict) -> typing.Union[str, bytes]:
+        return json.dumps(message, default=lambda o: None)
+
+    def decode(self, data: typing.Union[str, bytes]) -> dict:
+        return json.loads(data)
+
+
+class JsonCodec(MessageCodec):
+    pass
+
+
+class OrjsonCodec(MessageCodec):
+    """
+    Json encoded by orjson, the output is the same format, so every frontend can decode it.
+    Messages orjson can't encode, like integers larger than 64 bit, are encoded by the json module
+    """
+    name = "orjson"
+    format = "json"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            orjson = None
+        self._orjson = orjson
+
+    def is_available(self) -> bool:
+        return self._orjson is not None
+
+    def encode(self, message: dict) -> str:
+        try:
+            return self._orjson.dumps(message, default=_encode_unknown, option=self._orjson.OPT_NON_STR_KEYS | self._orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            return super().encode(message)
+
+    def decode(self, data: typing.Union[str, bytes]) -> dict:
+        return self._orjson.loads(data)
+
+
+class MsgpackCodec(MessageCodec):
+    """
+    MessagePack binary frames, smaller than json for numbers and arrays, bytes are received as Uint8Array by the frontend.
+    Messages msgpack can't encode are sent as json text frames
+    """
+    name = "msgpack"
+    format = "msgpack"
+
+    def __init__(self):
+        try:
+            import msgpack
+        except ImportError:
+            msgpack = None
+        self._msgpack = msgpack
+
+    def is_available(self) -> bool:
+        return self._msgpack is not None
+
+    def encode(self, message: dict) -> typing.Union[str, bytes]:
+        try:
+            return self._msgpack.packb(message, default=_encode_unknown, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            return super().encode(message)
+
+
+def _encode_unknown(o):
+    return None
+
+
+JSON_CODEC = JsonCodec()
+MESSAGE_CODECS = {codec.name: codec for codec in (JSON_CODEC, OrjsonCodec(), MsgpackCodec())}
+
+
+def get_codec(codec: typing.Union[str, MessageCodec]) -> MessageCodec:
+    """
+    Return codec by name, or codec itself if it already is a MessageCodec
+    """
+    if isinstance(codec, MessageCodec):
+        return codec
+    if codec not in MESSAGE_CODECS:
+        raise Exception("Unknown message codec '%s', use one of %s or a MessageCodec" % (codec, ", ".join(MESSAGE_CODECS)))
+    return MESSAGE_CODECS[codec]
+
+
+def select_codec(codecs: typing.Iterable[MessageCodec], formats: typing.Iterable[str]) -> MessageCodec:
+    """
+    First available codec whose format the frontend can decode, json if there is none
+    :param codecs: Codecs in order of preference
+    :param formats: Formats the frontend can decode
+    """
+    formats = set(formats)
+    for codec in codecs:
+        if codec.format in formats and codec.is_available() is True:
+            return codec
+    return JSON_CODEC
@@ -0,0 +1,32 @@
+"""
+Precompile view templates, so PyHtmlGui does not need to prepare and compile them on startup.
+
+    python -m pyhtmlgui.precompile -o template_cache myapp.views myapp.otherviews
+
+Modules are imported and all loaded PyHtmlView subclasses are compiled into the output directory,
+pass this directory as template_cache_dir to PyHtmlGui.
+"""
+import os
+import sys
+import argparse
+import importlib
+from .templateCache import precompile
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="pyhtmlgui-precompile", description="Precompile pyHtmlGui view templates")
+    parser.add_argument("modules", nargs="+", help="Modules that define view classes, eg. myapp.views")
+    parser.add_argument("-o", "--output", default="template_cache", help="Output directory, default: template_cache")
+    parser.add_argument("-t", "--template-dir", default=None, help="Template dir for views that use TEMPLATE_FILE")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    for module in args.modules:
+        importlib.import_module(module)
+    for key in precompile(args.output, template_dir=args.template_dir):
+        print("Compiled %s" % key)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
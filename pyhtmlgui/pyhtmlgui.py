@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import os
 import logging
@@ -14,10 +15,17 @@ import jinja2
 import typing
 from werkzeug.serving import make_server
 
-from .pyhtmlguiInstance import PyHtmlGuiInstance
+from .pyhtmlguiInstance import PyHtmlGuiInstance, BACKPRESSURE_POLICIES
+from .asyncioServer import AsyncioServerThread
+from .handlerPool import HandlerPool
+from .messageCodecs import MessageCodec, get_codec, select_codec
+from .templateCache import TemplateCache
 from .view import PyHtmlView
 import flask, flask_sock
 
+SERVER_BACKENDS = ("threaded", "asyncio")
+HANDLER_ORDERINGS = ("view", "instance", "none")
+
 class PyHtmlGui:
     def __init__(self,
                  app_instance     : object,
@@ -33,7 +41,18 @@ class PyHtmlGui:
                  listen_port      : int             = 0,
                  shared_secret    : str             = None,
                  auto_reload      : bool            = False,
-                 single_instance  : bool            = True
+                 single_instance  : bool            = True,
+                 diff_updates     : bool            = False,
+                 update_interval  : float           = None,
+                 send_queue_size  : int             = 1000,
+                 backpressure     : str             = "block",
+                 template_cache_dir: str            = None,
+                 server_backend   : str             = "threaded",
+                 handler_threads  : int             = None,
+                 handler_ordering : str             = "view",
+                 handler_queue_size: int            = 1000,
+                 send_priorities  : bool            = False,
+                 message_codecs   : typing.Sequence = ("json",),
                  ) -> None:
         """
         :param app_instance: Some object (eg. main program class instance), passed to view_class as obj on launch
@@ -54,7 +73,40 @@ class PyHtmlGui:
         :param auto_reload: for development, monitor files and reload while app is running
         :param single_instance: create only one instance and share it between all connected websockets.
                                 This is the default, so one instance of view_class is shared by all connected frontends
+        :param diff_updates: keep a copy of the frontend dom and send minimal patches instead of fully rendered elements on view updates
+        :param update_interval: None to render view updates immediately, or interval in seconds (eg. 0.016 or 0.05).
+                                Views are then marked dirty and rendered once per interval in a single batched message.
+        :param send_queue_size: Max number of messages queued per connection. Pending updates of the same element are replaced by newer ones
+        :param backpressure: What to do if a send queue is full, "block" waits, "coalesce" drops pending updates and renders
+                             the frontend again once it keeps up, "disconnect" closes the connection, the frontend will reconnect
+        :param template_cache_dir: Directory with templates compiled by "python -m pyhtmlgui.precompile".
+                                   Relative paths in frozen builds are relative to the bundle dir
+        :param server_backend: "threaded" serves every request and websocket in its own threads,
+                               "asyncio" serves all connections on one event loop and processes received messages in a
+                               small pool of worker threads, use it for many concurrently connected frontends
+        :param handler_threads: None to run python functions called from the frontend in the thread that receives the
+                                websocket messages, or number of worker threads that run them, so slow functions don't delay
+                                further messages of the frontend, like javascript results other functions wait for
+        :param handler_ordering: With handler_threads, "view" runs calls to functions of the same view one after another,
+                                 "instance" all calls of a view instance, "none" runs all calls in parallel
+        :param handler_queue_size: Max number of calls waiting for a handler thread, receiving waits if the queue is full
+        :param send_priorities: Send results of python calls and small updates made by them before other queued updates,
+                                and updates of autoupdate views after them. Updates of the same elements keep their order
+        :param message_codecs: Codecs for messages sent to frontends in order of preference, names "json", "orjson", "msgpack"
+                               or MessageCodec instances. Each connection uses the first codec that is installed and whose
+                               format the frontend can decode, or "json"
         """
+        if server_backend not in SERVER_BACKENDS:
+            raise Exception("Unknown server backend '%s', use one of %s" % (server_backend, ", ".join(SERVER_BACKENDS)))
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError("Unknown backpressure policy '%s', use one of %s" % (backpressure, ", ".join(BACKPRESSURE_POLICIES)))
+        if handler_ordering not in HANDLER_ORDERINGS:
+            raise Exception("Unknown handler ordering '%s', use one of %s" % (handler_ordering, ", ".join(HANDLER_ORDERINGS)))
+        if handler_threads is not None and handler_threads < 1:
+            raise Exception("handler_threads must be at least 1, or None to run handlers in the receiving thread")
+        if handler_queue_size < 1:
+            raise Exception("handler_queue_size must be at least 1")
+
 
         self._endpoints = {}
 
@@ -80,6 +132,14 @@ class PyHtmlGui:
         self.listen_host = listen_host
         self.listen_port = listen_port
         self.auto_reload = auto_reload
+        self.diff_updates = diff_updates
+        self.update_interval = update_interval
+        self.send_queue_size = send_queue_size
+        self.backpressure = backpressure
+        self.handler_ordering = handler_ordering
+        self.send_priorities = send_priorities
+        self.message_codecs = [get_codec(codec) for codec in message_codecs]
+        self._handler_pool = HandlerPool(handler_threads, handler_queue_size) if handler_threads is not None else None
 
         self.static_dir = None if static_dir is None else os.path.abspath(static_dir)
         self.template_dir = None if template_dir is None else os.path.abspath(template_dir)
@@ -87,6 +147,9 @@ class PyHtmlGui:
         if getattr(sys, 'frozen', False) is True:
             # noinspection PyUnresolvedReferences,PyProtectedMember
             self._internal_template_dir = os.path.join(sys._MEIPASS, "pyhtmlgui", "templates")
+            if template_cache_dir is not None and not os.path.isabs(template_cache_dir):
+                # noinspection PyUnresolvedReferences,PyProtectedMember
+                template_cache_dir = os.path.join(sys._MEIPASS, template_cache_dir)
             self.auto_reload = False
         else:
             self._internal_template_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "templates")
@@ -97,6 +160,7 @@ class PyHtmlGui:
 
         self.template_loader = jinja2.FileSystemLoader(searchpath=[self._internal_template_dir] if self.template_dir is None else [self._internal_template_dir, self.template_dir])
         self._template_env = jinja2.Environment(loader=self.template_loader, autoescape=jinja2.select_autoescape())
+        self._template_cache = TemplateCache(self, template_cache_dir)
 
         self._token_cookie = "%s" % uuid.uuid4()
         self._token_csrf = "%s" % uuid.uuid4()
@@ -111,7 +175,13 @@ class PyHtmlGui:
         self.flaskWebsocket.route("/ws")(self._websocket)
         self.flaskWebsocket.init_app(self.flaskApp)
 
-        self._server = WebsocketServerThread(self.flaskApp, self.listen_host, self.listen_port)
+        if server_backend == "asyncio":
+            self._server = AsyncioServerThread(self, self.flaskApp, self.listen_host, self.listen_port)
+        else:
+            self._server = WebsocketServerThread(self.flaskApp, self.listen_host, self.listen_port)
+
+        self._event_loop = None
+        self._event_loop_lock = threading.Lock()
 
         self._file_monitoring = {}
         if self.auto_reload is True:
@@ -157,6 +227,26 @@ class PyHtmlGui:
             position = position
         )
 
+    def get_stats(self) -> dict:
+        """
+        Receive statistics of all view instances, by endpoint name
+        """
+        return {name: [instance.get_stats() for instance in endpoint._gui_instances] for name, endpoint in self._endpoints.items()}
+
+    def get_event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Event loop that runs "async def" view methods called from the frontend.
+        This is the server loop with server_backend "asyncio", otherwise a loop in a thread that is started on first use
+        """
+        with self._event_loop_lock:
+            if self._event_loop is None:
+                if isinstance(self._server, AsyncioServerThread):
+                    self._event_loop = self._server.loop
+                else:
+                    self._event_loop = asyncio.new_event_loop()
+                    threading.Thread(target=self._event_loop.run_forever, daemon=True).start()
+            return self._event_loop
+
     def get_url(self, endpoint = ""):
         if endpoint in self._endpoints:
             return self._endpoints[endpoint].get_url()
@@ -201,20 +291,32 @@ class PyHtmlGui:
 
     # /ws
     def _websocket(self, ws, endpoint= ""):
-        endpoint = flask.request.cookies.get('endpoint',"")
-        if flask.request.cookies.get('token') != self._token_cookie or flask.request.args.get('token') != self._token_csrf:
-            msg = "token_failed"
-        elif endpoint not in self._endpoints:
-            msg = "no_endpoint"
-        else:
-            self._endpoints[endpoint].process_websocket(ws)
-            msg = None
+        msg = self._check_websocket_request(flask.request.cookies, flask.request.args)
+        if msg is None:
+            codec = self._select_message_codec(flask.request.args)
+            self._endpoints[flask.request.cookies.get('endpoint', "")].process_websocket(ws, codec)
         try:
             ws.close(message=msg)
         except:
             pass
 
-    def _add_file_to_monitor(self, file_to_monitor, class_name) -> None:
+    def _check_websocket_request(self, cookies: typing.Mapping, args: typing.Mapping) -> typing.Union[str, None]:
+        """
+        Return the reason to close a new websocket connection with, or None if it is allowed to connect
+        """
+        if cookies.get('token') != self._token_cookie or args.get('token') != self._token_csrf:
+            return "token_failed"
+        if cookies.get('endpoint', "") not in self._endpoints:
+            return "no_endpoint"
+        return None
+
+    def _select_message_codec(self, args: typing.Mapping) -> MessageCodec:
+        """
+        Codec for a new websocket connection, the frontend lists the formats it can decode in the "formats" argument
+        """
+        return select_codec(self.message_codecs, (args.get('formats') or "json").split(","))
+
+    def _add_file_to_monitor(self, file_to_monitor, template_key) -> None:
         if self.auto_reload is False:
             return
         if file_to_monitor not in self._file_monitoring:
@@ -222,9 +324,9 @@ class PyHtmlGui:
             self._file_monitoring[file_to_monitor] = {
                 "file_to_monitor": file_to_monitor,
                 "last_changed": last_changed,
-                "class_names": set(),
+                "template_keys": set(),
             }
-        self._file_monitoring[file_to_monitor]["class_names"].add(class_name)
+        self._file_monitoring[file_to_monitor]["template_keys"].add(template_key)
 
     def _monitoring_thread(self) -> None:
         while self.auto_reload is True:
@@ -236,12 +338,13 @@ class PyHtmlGui:
                 current_ts = os.path.getmtime(data["file_to_monitor"])
                 if current_ts != data["last_changed"]:
                     self._file_monitoring[file_to_monitor]["last_changed"] = current_ts
-                    classed_to_reload.extend(self._file_monitoring[file_to_monitor]["class_names"])
+                    classed_to_reload.extend(self._file_monitoring[file_to_monitor]["template_keys"])
                     has_changed = True
             if has_changed is True:
+                self._template_cache.clear(classed_to_reload)  # shared by all instances, also those connected later
                 for endpoint in self._endpoints:
                     for instance in self._endpoints[endpoint]._gui_instances:
-                        instance.clear_template_cache(classed_to_reload)
+                        instance._on_templates_changed()
                         try:
                             instance.update()
                         except Exception:
@@ -283,16 +386,20 @@ class PyHtmlGuiEndpoint:
         self.name = name
         self._gui_instances = []
 
-    def process_websocket(self, ws):
+    def process_websocket(self, ws, codec: MessageCodec = None):
+        instance = self._get_instance()
+        instance.process(ws, codec)  # loop while connected
+        self._release_instance(instance)
+
+    def _get_instance(self) -> PyHtmlGuiInstance:
         if len(self._gui_instances) == 0 or self.single_instance is False:
             instance = PyHtmlGuiInstance(self.parent, self.app_instance, self.view_class, self._on_dom_ready_callback)
             self._gui_instances.append(instance)
         else:
             instance = self._gui_instances[0]
+        return instance
 
-        instance.process(ws)  # loop while connected
-
-        # release/remove Instance
+    def _release_instance(self, instance: PyHtmlGuiInstance) -> None:
         if instance.connections_count == 0:
             self._gui_instances.remove(instance)
         if self.on_view_disconnected_callback is not None:
@@ -1,24 +1,38 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import threading
 import time
 import typing
 import jinja2
 import weakref
 import traceback
-import re
-import os
-import sys
-import inspect
 import json
 import logging
-import queue
-import importlib
+import contextlib
+import collections
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pyhtmlgui.pyhtmlgui import PyHtmlGui
     from pyhtmlgui.view.pyhtmlview import PyHtmlView
 from .lib import WeakFunctionReferences
+from .lib.htmlDiff import DomMirror
+from .messageCodecs import MessageCodec, JSON_CODEC
+
+# pending calls that fully define an element, a newer call for the same element replaces the queued one
+COALESCED_CALLS = ("pyhtmlgui.replace_element", "pyhtmlgui.update_element")
+BACKPRESSURE_POLICIES = ("block", "coalesce", "disconnect")
+# asks the frontend to request a full render after pending updates were dropped
+RESYNC_MESSAGE = json.dumps({'call': 0, 'name': 'pyhtmlgui.resync', 'args': [], 'skip_results': True})
+# priority classes of outbound messages, highest first. "high" are results of python calls and small updates made by them,
+# "low" are updates of views rendered by autoupdate polling
+SEND_LANES = ("high", "normal", "low")
+# calls whose first argument is the id of the element they change
+ELEMENT_CALLS = ("pyhtmlgui.replace_element", "pyhtmlgui.update_element", "pyhtmlgui.patch_element", "pyhtmlgui.insert_element",
+                 "pyhtmlgui.insert_elements", "pyhtmlgui.move_element", "pyhtmlgui.remove_element")
+# updates made by python calls from the frontend that are larger than this are sent in the "normal" lane
+SMALL_UPDATE_SIZE = 4096
 
 class PyHtmlGuiInstance:
     def __init__(self, parent: PyHtmlGui, app_instance: object, view_class: typing.Type[PyHtmlView], _on_dom_ready_callback):
@@ -26,12 +40,21 @@ class PyHtmlGuiInstance:
         self._on_dom_ready_callback = _on_dom_ready_callback
         self._websocket_connections = []
         self._children = weakref.WeakSet()
-        self._template_env = jinja2.Environment(loader=parent.template_loader, autoescape=jinja2.select_autoescape())
-        self._template_cache = {}
+        self._views_by_uid = weakref.WeakValueDictionary()
+        self._dom_mirror = DomMirror() if parent.diff_updates is True else None
+        self._update_scheduler = UpdateScheduler(self, parent.update_interval) if parent.update_interval is not None else None
+        self._call_batch = None
+        self._call_batch_depth = 0
+        self._call_batch_lock = threading.RLock()  # held while a batch is flushed, callbacks may call javascript
+        self._snapshot = None  # (generation, html) of the last full render
+        self._snapshot_generation = 0  # increased on every call that may change the frontend dom
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_stats = {"hits": 0, "misses": 0}
+        self._suppressed_updates = collections.Counter()  # view class name -> updates that rendered unchanged html
         self._call_number = 0
         self._function_references = WeakFunctionReferences()
-        self._template_env.globals['_create_py_function_reference'] = self._create_function_reference
         self.pending_js_results = {}
+        self._lane_context = threading.local()
         self._polling_children = {}
         self._polling_thread = None
         self._view = view_class(app_instance, self)
@@ -40,14 +63,83 @@ class PyHtmlGuiInstance:
     def connections_count(self) -> int:
         return len(self._websocket_connections)
 
-    def update(self) -> None:
-        self.call_javascript("pyhtmlgui.update_element", ["pyHtmlGuiBody", self._view.render()], skip_results=True)
+    def update(self, connection: WebsocketConnection = None) -> None:
+        """
+        Render the whole view tree and send it to the frontend
+        :param connection: Send only to this connection, eg. a newly connected frontend, instead of all connections
+        """
+        if connection is None:
+            self.call_javascript("pyhtmlgui.update_element", ["pyHtmlGuiBody", self._view.render()], skip_results=True)
+        else:
+            self.call_javascript("pyhtmlgui.update_element", ["pyHtmlGuiBody", self.render_snapshot()], skip_results=True, connection=connection)
+
+    def render_snapshot(self) -> str:
+        """
+        Return the rendered view tree. The result is cached until the frontend dom is changed by a view update,
+        so many frontends connecting at once cause only one render.
+        """
+        with self._snapshot_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == self._snapshot_generation:
+                self._snapshot_stats["hits"] += 1
+                return snapshot[1]
+            self._snapshot_stats["misses"] += 1
+            generation = self._snapshot_generation
+            html = self._view.render()
+            self._snapshot = (generation, html)  # invalid already if a view was updated during render
+            return html
+
+    def _invalidate_snapshot(self) -> None:
+        self._snapshot_generation += 1
+        self._snapshot = None
+
+    def get_stats(self) -> dict:
+        stats = {"connections": self.connections_count}
+        stats["send_queues"] = [c.send_queue.get_stats() for c in self._websocket_connections if c.send_queue is not None]
+        stats["codecs"] = dict(collections.Counter(c.codec.name for c in self._websocket_connections))
+        if self._update_scheduler is not None:
+            stats["updates"] = self._update_scheduler.get_stats()
+        stats["snapshots"] = dict(self._snapshot_stats)
+        stats["suppressed_updates"] = dict(self._suppressed_updates)
+        if self._parent._handler_pool is not None:
+            stats["handler_pool"] = self._parent._handler_pool.get_stats()
+        return stats
+
+    @contextlib.contextmanager
+    def batched_calls(self):
+        """
+        Collect all javascript calls that don't receive results and send them in a single message on exit.
+        Calls from other threads while a batch is open are added to the batch too, so their order is kept.
+        Calls that receive results, or are sent to a single connection, are not batched, the calls collected before them
+        are sent first, so they are never overtaken.
+        """
+        with self._call_batch_lock:
+            if self._call_batch_depth == 0:
+                self._call_batch = []
+            self._call_batch_depth += 1
+        try:
+            yield
+        finally:
+            calls = None
+            with self._call_batch_lock:
+                self._call_batch_depth -= 1
+                if self._call_batch_depth == 0:
+                    calls, self._call_batch = self._call_batch, None
+            if calls is not None:
+                self._send_call_batch(calls)
+
+    def _send_call_batch(self, calls: list) -> None:
+        if len(calls) == 1:
+            self._send_javascript_call(calls[0][0], calls[0][1], skip_results=True)
+        elif len(calls) > 1:
+            self._send_javascript_call("pyhtmlgui.call_batch", [calls], skip_results=True)
 
     def set_visible(self, visible: bool) -> None:
         """
         Set component and childens visibility, components that are not visible get their events detached
         """
         if visible is False:
+            self._invalidate_snapshot()  # hidden views are detached, the next frontend needs a full render
             for child in self._children:
                 try:
                     if child.is_visible is True:
@@ -57,14 +149,40 @@ class PyHtmlGuiInstance:
         else:
             self.update()
 
-    def call_javascript(self, js_function_name: str, args: list = None, skip_results: bool = False):
+    def call_javascript(self, js_function_name: str, args: list = None, skip_results: bool = False, connection: WebsocketConnection = None):
         """
         Call javascript function in frontend.
         :param js_function_name: Name of javascript function
         :param args: Arguments for js function
         :param skip_results: Don't receive results, give some slight performance improvement if we don't wait for result
+        :param connection: Call only in this frontend connection, default is to call in all connected frontends
         """
-
+        if connection is None:
+            self._invalidate_snapshot()
+        if self._call_batch is not None:
+            with self._call_batch_lock:
+                if self._call_batch is not None:
+                    if skip_results is True and connection is None:
+                        if self._dom_mirror is not None:
+                            self._dom_mirror.apply_call(js_function_name, args)
+                        self._call_batch.append([js_function_name, args if args is not None else []])
+                        return None
+                    # not batched, send the calls collected so far first, so this call does not overtake them
+                    calls, self._call_batch = self._call_batch, []
+                    self._send_call_batch(calls)
+                    return self._call_javascript(js_function_name, args, skip_results, connection)
+        return self._call_javascript(js_function_name, args, skip_results, connection)
+
+    def _call_javascript(self, js_function_name: str, args: list, skip_results: bool, connection: WebsocketConnection):
+        if connection is not None:
+            # other frontends keep their dom, so the mirror only follows if this is the only frontend
+            if self._dom_mirror is not None and self._websocket_connections == [connection]:
+                self._dom_mirror.apply_call(js_function_name, args)
+        elif self._dom_mirror is not None:
+            self._dom_mirror.apply_call(js_function_name, args)
+        return self._send_javascript_call(js_function_name, args, skip_results, connection=connection)
+
+    def _send_javascript_call(self, js_function_name: str, args: list = None, skip_results: bool = False, connection: WebsocketConnection = None):
         self._call_number  += 1
         call_id = self._call_number
 
@@ -74,24 +192,85 @@ class PyHtmlGuiInstance:
         except:
             pass
 
+        websocket_connections = [w for w in self._websocket_connections] if connection is None else [connection]
         javascript_call_object = {'call': call_id, 'name': js_function_name, 'args': args if args is not None else []}
         javascript_call_result = None
         if skip_results is False:
-            javascript_call_result = JavascriptCallResult(self, call_id, len(self._websocket_connections) )
+            javascript_call_result = JavascriptCallResult(self, call_id, websocket_connections)
             self.pending_js_results[call_id] = javascript_call_result
         else:
             javascript_call_object["skip_results"] = True
 
-        data = json.dumps(javascript_call_object, default=lambda o: None)
-        for websocket_connection in [w for w in self._websocket_connections]:
-            websocket_connection.send(data)
+        key = None
+        if skip_results is True and js_function_name in COALESCED_CALLS:
+            key = (js_function_name, javascript_call_object["args"][0])
+
+        lane, targets, scope = "normal", None, None
+        if self._parent.send_priorities is True and len(websocket_connections) > 0:
+            lane = getattr(self._lane_context, "lane", "normal")
+            targets, scope = self._get_changed_elements(js_function_name, javascript_call_object["args"])
+        encoded = {}  # codec name -> message, encoded once for all connections that use the codec
+        for websocket_connection in websocket_connections:
+            codec = websocket_connection.codec
+            data = encoded.get(codec.name)
+            if data is None:
+                data = encoded[codec.name] = codec.encode(javascript_call_object)
+            connection_lane = lane
+            if lane == "high" and len(data) > SMALL_UPDATE_SIZE and targets != frozenset():
+                connection_lane = "normal"
+            websocket_connection.send(data, key=key, droppable=skip_results, lane=connection_lane, targets=targets, scope=scope)
         return javascript_call_result
 
-    def process(self, ws) -> None:
-        websocket_connection = WebsocketConnection(ws, self)
-        self._websocket_connections.append(websocket_connection)
+    @contextlib.contextmanager
+    def send_lane(self, lane: str):
+        """
+        Javascript calls made by this thread inside the context are sent in lane, if the gui uses send_priorities
+        :param lane: One of SEND_LANES
+        """
+        previous = getattr(self._lane_context, "lane", "normal")
+        self._lane_context.lane = lane
+        try:
+            yield
+        finally:
+            self._lane_context.lane = previous
+
+    def _get_changed_elements(self, js_function_name: str, args: list) -> tuple:
+        """
+        Uids of the views a javascript call changes, and of these views and all their ancestors, (None, None) if unknown
+        """
+        if js_function_name == "pyhtmlgui.debug_msg":
+            return frozenset(), frozenset()
+        calls = args[0] if js_function_name == "pyhtmlgui.call_batch" else [[js_function_name, args]]
+        targets, scope = set(), set()
+        for name, call_args in calls:
+            if name not in ELEMENT_CALLS or len(call_args) == 0 or not isinstance(call_args[0], str):
+                return None, None
+            uid = call_args[0].split("_", 1)[0]  # element ids of views are the uid, or the uid followed by _name
+            if uid in targets:
+                continue
+            view = self._views_by_uid.get(uid)
+            if view is None:
+                return None, None
+            targets.add(uid)
+            while view is not None and view is not self and uid not in scope:
+                scope.add(view.uid)
+                view = view.parent
+                uid = getattr(view, "uid", None)
+        return frozenset(targets), frozenset(scope)
+
+    def process(self, ws, codec: MessageCodec = None) -> None:
+        websocket_connection = WebsocketConnection(ws, self, self._parent.send_queue_size, self._parent.backpressure, codec)
+        self._add_connection(websocket_connection)
         websocket_connection.receive_loop()
+        self._remove_connection(websocket_connection)
+
+    def _add_connection(self, websocket_connection: WebsocketConnection) -> None:
+        self._websocket_connections.append(websocket_connection)
+
+    def _remove_connection(self, websocket_connection: WebsocketConnection) -> None:
         self._websocket_connections.remove(websocket_connection)
+        for javascript_call_result in list(self.pending_js_results.values()):
+            javascript_call_result.connection_closed(websocket_connection)
         if len(self._websocket_connections) == 0:
             self.set_visible(False)
 
@@ -108,107 +287,41 @@ class PyHtmlGuiInstance:
         :param force_reload: Force reloading of template
         :return:
         """
-        if force_reload is False:
-            try:
-                return self._template_cache[item.__class__.__name__]
-            except KeyError:
-                pass
-
-        if item.__class__.TEMPLATE_FILE is not None:  # load from file
-            file_to_monitor = self._template_env.get_template(item.TEMPLATE_FILE).filename
-            string_to_render = open(file_to_monitor, "r").read()
-        else:  # load from class
-            if self._parent.auto_reload is False:
-                string_to_render = item.TEMPLATE_STR
-                file_to_monitor = None
-            else:
-                module_name = item.__module__
-                if module_name is None or module_name == str.__class__.__module__:
-                    module_fullname = item.__class__.__name__  # Avoid reporting __builtin__
-                else:
-                    module_fullname = module_name + '.' + item.__class__.__name__
-
-                try:
-                    file_to_monitor = os.path.abspath(inspect.getfile(item.__class__))
-                except Exception:  # in case its in main. this may be a bug in inspect
-                    file_to_monitor = os.path.abspath(sys.argv[0])
-
-                if module_name == "__main__":
-                    name = os.path.splitext(os.path.basename(file_to_monitor))[0]
-                    module = __import__(name)
-                    importlib.reload(module)  # reload should work on non complex objects in __main__, but not for more
-                    for comp in module_fullname.split(".")[1:]:
-                        module = getattr(module, comp)
-                else:
-                    loader = importlib.machinery.SourceFileLoader(module_name, file_to_monitor)
-                    # noinspection PyUnresolvedReferences
-                    spec = importlib.util.spec_from_loader(loader.name, loader)
-                    # noinspection PyUnresolvedReferences
-                    module = importlib.util.module_from_spec(spec)
-                    loader.exec_module(module)
-                    module = getattr(module, module_fullname.split(".")[-1])
-                string_to_render = module.TEMPLATE_STR
+        return self._parent._template_cache.get(item.__class__, force_reload)
 
-        if self._parent.auto_reload is True:
-            self._parent._add_file_to_monitor(file_to_monitor, item.__class__.__name__)
+    def clear_template_cache(self, keys: typing.Iterable[str] = None) -> None:
+        """
+        Remove compiled templates and rendered html, so templates are loaded again on next render
+        :param keys: Template cache keys of view classes, None to clear all
+        """
+        self._parent._template_cache.clear(keys)
+        self._on_templates_changed()
 
-        string_to_render = self._prepare_template(string_to_render)
+    def _on_templates_changed(self) -> None:
+        """
+        Templates were loaded again, html cached by views is outdated
+        """
+        for view in list(self._views_by_uid.values()):
+            view._render_dirty = True
 
-        try:
-            self._template_cache[item.__class__.__name__] = self._template_env.from_string(string_to_render)
-        except Exception as e:
-            msg = "Failed to load Template "
-            if item.TEMPLATE_FILE is not None:
-                msg += "from File '%s': " % item.TEMPLATE_FILE
-            else:
-                msg += "from Class '%s': " % item.__class__.__name__
-            msg += " %s" % e
-            raise Exception(msg)
+    def _add_child(self, child: PyHtmlView) -> None:
+        self._children.add(child)
 
-        return self._template_cache[item.__class__.__name__]
+    def _count_suppressed_update(self, view: PyHtmlView) -> None:
+        self._suppressed_updates[view.__class__.__name__] += 1
 
-    @staticmethod
-    def _prepare_template(template: str) -> str:
-        """
-            Replace onclick="pyview.my_function(arg1,arg2)"
-            with    onclick="pyhtmlgui.call({{_create_py_function_reference(pyview.my_function)}}, arg1, arg2)
-        """
-        parts = re.split('({{|}}|{%|%})', template)
-        index = 0
-        while index < len(parts):
-            if parts[index] == "{{" or parts[index] == "{%" :
-                parts[index] = "%s%s%s" % (parts[index] , parts[index+1], parts[index+2])
-                del parts[index+ 1]
-                del parts[index+ 1]
-            index += 1
-
-        new_parts = []
-        for i, part in enumerate(parts):
-            if part.startswith("{{") or part.startswith("{%") or part.find("pyview.") == -1:
-                new_parts.append(part)
-            else:
-                # noinspection RegExpSingleCharAlternation
-                subparts = re.split(r'(>| |\(|=|\"|\'|\n|\r|\t|;)(pyview.[a-zA-Z0-9_.]+\()', part)
-                for x, subpart in enumerate(subparts):
-                    if subpart.startswith("pyview."):
-                        subpart = subpart.replace("(", ")}}, ", 1)
-                        subparts[x] = "pyhtmlgui.call({{_create_py_function_reference(%s" % subpart
-                for sp in subparts:
-                    new_parts.append(sp)
-        return "".join(new_parts).replace(r'\pyview.', 'pyview.')
-
-    def clear_template_cache(self, classnames: str = None) -> None:
-        if classnames is None:
-            self._template_cache = {}
-        else:
-            for classname in classnames:
-                try:
-                    del self._template_cache[classname]
-                except Exception:
-                    pass
+    def _register_view(self, view: PyHtmlView) -> None:
+        self._views_by_uid[view.uid] = view
 
-    def _add_child(self, child: PyHtmlView) -> None:
-        self._children.add(child)
+    def _request_update(self, uid: str) -> None:
+        """
+        Frontend failed to apply a patch to element uid, forget our copy so the next update replaces the element
+        """
+        if self._dom_mirror is not None:
+            self._dom_mirror.forget(uid)
+        view = self._views_by_uid.get(uid)
+        if view is not None and view.is_visible is True:
+            view.update()
 
     def _remove_child(self, child: PyHtmlView) -> None:
         self._children.remove(child)
@@ -245,17 +358,276 @@ class PyHtmlGuiInstance:
                 if i % interval == 0:
                     for child in self._polling_children[key]:
                         if child.is_visible and child._last_rendered + interval/2.0 < now:
-                            child.update()
+                            with self.send_lane("low"):
+                                child.update()
             i += 1
             time.sleep(1)
 
 
+class UpdateScheduler:
+    """
+    Collect views that need an update and render them once per interval.
+    Views that have a dirty ancestor are skipped, because they are rendered as part of that ancestor.
+    """
+    def __init__(self, pyHtmlGuiInstance, interval: float):
+        self._instance_wref = weakref.ref(pyHtmlGuiInstance)
+        self.interval = interval
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._thread = None
+        self._stats = {"requested": 0, "rendered": 0, "coalesced": 0, "flushes": 0}
+
+    def schedule(self, view: PyHtmlView) -> None:
+        with self._lock:
+            self._stats["requested"] += 1
+            if view.uid in self._dirty:
+                self._stats["coalesced"] += 1
+            else:
+                self._dirty[view.uid] = view
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, daemon=True)
+                self._thread.start()
+        self._event.set()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, pending=len(self._dirty))
+
+    def flush(self) -> None:
+        instance = self._instance_wref()
+        with self._lock:
+            views = list(self._dirty.values())
+            self._dirty = {}
+        if instance is None or len(views) == 0:
+            return
+        dirty = set([id(view) for view in views])
+        to_render = []
+        for view in views:
+            parent = view.parent
+            while parent is not None and parent is not instance and id(parent) not in dirty:
+                parent = parent.parent
+            if parent is None or parent is instance:
+                to_render.append(view)
+        rendered = 0
+        with instance.batched_calls():
+            for view in to_render:
+                if view.is_visible is True:
+                    try:
+                        view._update()
+                        rendered += 1
+                    except Exception:
+                        logging.error("Failed to update, %s" % traceback.format_exc())
+        with self._lock:
+            self._stats["flushes"] += 1
+            self._stats["rendered"] += rendered
+            self._stats["coalesced"] += len(views) - len(to_render)
+
+    def _loop(self) -> None:
+        while self._instance_wref() is not None:
+            if self._event.wait(5) is False:
+                continue
+            self._event.clear()
+            self.flush()
+            time.sleep(self.interval)
+
+
+class SendQueue:
+    """
+    Outbound messages of one websocket connection.
+    Messages put with a key replace a pending message with the same key, the replaced message is dropped and the
+    new one is appended, so it is still sent after all messages that were queued before it.
+    Messages are queued in lanes, see SEND_LANES, the next message is taken from the highest lane that is not empty.
+    A message never overtakes a pending message in a lower lane that changes the same dom elements,
+    it is queued in that lower lane instead. A lane that was passed over starvation_limit times sends its next message
+    before higher lanes, so background updates still reach the frontend under load.
+    """
+    def __init__(self, maxsize: int = 1000, starvation_limit: int = 8):
+        self.maxsize = maxsize
+        self.starvation_limit = starvation_limit
+        self._lanes = {lane: collections.OrderedDict() for lane in SEND_LANES}
+        self._keys = {}  # key -> (lane, number) of pending message
+        # per lane counts of pending messages, so related elements are looked up instead of scanning the lanes
+        self._targets = {lane: collections.Counter() for lane in SEND_LANES}  # uid -> messages changing it
+        self._scopes = {lane: collections.Counter() for lane in SEND_LANES}  # uid -> messages changing it or a child
+        self._unknown = dict.fromkeys(SEND_LANES, 0)  # messages with unknown targets
+        self._changing = dict.fromkeys(SEND_LANES, 0)  # messages that change elements, or with unknown targets
+        self._length = 0
+        self._number = 0
+        self._closed = False
+        self._passed_over = dict.fromkeys(SEND_LANES, 0)
+        self._condition = threading.Condition()
+        self._stats = {"sent": 0, "coalesced": 0, "dropped": 0, "overflows": 0}
+        self._lane_stats = {lane: {"sent": 0, "max_pending": 0, "starved": 0, "demoted": 0} for lane in SEND_LANES}
+
+    def put(self, message, key=None, droppable: bool = False, block: bool = True, lane: str = "normal", targets: frozenset = None, scope: frozenset = None) -> bool:
+        """
+        Add message to queue, returns False if the queue is full and block is False
+        :param lane: One of SEND_LANES
+        :param targets: Uids of the views whose elements the message changes, an empty set if it changes no elements,
+                        None if unknown
+        :param scope: Uids of targets and all their ancestors
+        """
+        with self._condition:
+            if key is not None and key in self._keys:
+                key_lane, number = self._keys.pop(key)
+                replaced = self._lanes[key_lane].pop(number)
+                self._count(key_lane, replaced[3], replaced[4], -1)
+                self._length -= 1
+                self._stats["coalesced"] += 1
+            while self._length >= self.maxsize and self._closed is False:
+                if block is False:
+                    self._stats["overflows"] += 1
+                    return False
+                self._condition.wait()
+            lane = self._get_lane(lane, targets, scope)
+            self._number += 1
+            self._lanes[lane][self._number] = (message, key, droppable, targets, scope)
+            self._count(lane, targets, scope, 1)
+            self._length += 1
+            if key is not None:
+                self._keys[key] = (lane, self._number)
+            lane_stats = self._lane_stats[lane]
+            lane_stats["max_pending"] = max(lane_stats["max_pending"], len(self._lanes[lane]))
+            self._condition.notify_all()
+            return True
+
+    def _get_lane(self, lane: str, targets: frozenset, scope: frozenset) -> str:
+        """
+        Lane for a new message, the lowest lane below the requested one that has a pending message for related elements
+        """
+        for lower in reversed(SEND_LANES[SEND_LANES.index(lane) + 1:]):
+            if self._changes_related_elements(lower, targets, scope) is True:
+                self._lane_stats[lane]["demoted"] += 1
+                return lower
+        return lane
+
+    def _count(self, lane: str, targets: frozenset, scope: frozenset, delta: int) -> None:
+        """
+        Add (delta 1) or remove (delta -1) a pending message to the element counts of lane
+        """
+        if targets is None:
+            self._unknown[lane] += delta
+            self._changing[lane] += delta
+            return
+        if len(targets) == 0:
+            return
+        self._changing[lane] += delta
+        for counts, uids in ((self._targets[lane], targets), (self._scopes[lane], scope)):
+            for uid in uids:
+                counts[uid] += delta
+                if counts[uid] == 0:
+                    del counts[uid]
+
+    def _changes_related_elements(self, lane: str, targets: frozenset, scope: frozenset) -> bool:
+        """
+        True if a pending message in lane changes the same element as a message with targets and scope,
+        or one of them changes an element that contains an element the other changes.
+        Messages that change no elements are never related, messages with unknown targets are related to all others.
+        """
+        if targets is None:
+            return self._changing[lane] > 0
+        if len(targets) == 0:
+            return False
+        if self._unknown[lane] > 0:
+            return True
+        scopes, lane_targets = self._scopes[lane], self._targets[lane]
+        return any(uid in scopes for uid in targets) or any(uid in lane_targets for uid in scope)
+
+    def get(self, block: bool = True):
+        """
+        Wait for next message, returns None if the queue was closed and all messages are sent,
+        or if block is False and the queue is empty
+        """
+        with self._condition:
+            while self._length == 0:
+                if self._closed is True or block is False:
+                    return None
+                self._condition.wait()
+            lane = self._next_lane()
+            number, (message, key, droppable, targets, scope) = self._lanes[lane].popitem(last=False)
+            self._count(lane, targets, scope, -1)
+            if key is not None:
+                del self._keys[key]
+            self._length -= 1
+            self._stats["sent"] += 1
+            self._lane_stats[lane]["sent"] += 1
+            self._condition.notify_all()
+            return message
+
+    def _next_lane(self) -> str:
+        waiting = [lane for lane in SEND_LANES if len(self._lanes[lane]) > 0]
+        lane = waiting[0]
+        for lower in reversed(waiting[1:]):
+            if self._passed_over[lower] >= self.starvation_limit and self._may_overtake(lower) is True:
+                lane = lower
+                self._lane_stats[lane]["starved"] += 1
+                break
+        for other in waiting:
+            self._passed_over[other] = 0 if other == lane else self._passed_over[other] + 1
+        return lane
+
+    def _may_overtake(self, lane: str) -> bool:
+        """
+        True if the next message of lane changes no elements that older messages in higher lanes change.
+        Messages in higher lanes that are related to it are always older, newer ones were demoted to its lane by put.
+        """
+        message, key, droppable, targets, scope = next(iter(self._lanes[lane].values()))
+        for higher in SEND_LANES[:SEND_LANES.index(lane)]:
+            if self._changes_related_elements(higher, targets, scope) is True:
+                return False
+        return True
+
+    def drop(self) -> int:
+        """
+        Remove all droppable messages from queue, return number of dropped messages
+        """
+        with self._condition:
+            count = 0
+            for lane, messages in self._lanes.items():
+                dropped = [number for number, (message, key, droppable, targets, scope) in messages.items() if droppable is True]
+                for number in dropped:
+                    message, key, droppable, targets, scope = messages.pop(number)
+                    self._count(lane, targets, scope, -1)
+                    if key is not None:
+                        del self._keys[key]
+                count += len(dropped)
+            self._length -= count
+            self._stats["dropped"] += count
+            self._condition.notify_all()
+            return count
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            lanes = {lane: dict(stats, pending=len(self._lanes[lane])) for lane, stats in self._lane_stats.items()}
+            return dict(self._stats, pending=self._length, lanes=lanes)
+
+
 class WebsocketConnection:
-    def __init__(self, ws, pyHtmlGuiInstance):
+    def __init__(self, ws, pyHtmlGuiInstance, send_queue_size: int = 1000, backpressure: str = "block", codec: MessageCodec = None):
+        """
+        :param codec: Encodes messages sent and decodes messages received on this connection, default json
+        :param backpressure: What to do if the send queue is full because the frontend can't keep up.
+                             "block" waits until messages are sent,
+                             "coalesce" drops all pending view updates and sends a full render instead,
+                             "disconnect" closes the connection, the frontend will reconnect and render again
+        """
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise Exception("Unknown backpressure policy '%s', use one of %s" % (backpressure, ", ".join(BACKPRESSURE_POLICIES)))
         self.ws = ws
         self.parent_instance = pyHtmlGuiInstance
         self.active = True
-        self.send_queue = queue.Queue(maxsize=1000)
+        self.backpressure = backpressure
+        self.codec = codec if codec is not None else JSON_CODEC
+        self.send_queue = SendQueue(maxsize=send_queue_size)
+        self._start_send_loop()
+
+    def _start_send_loop(self):
         self._send_t = threading.Thread(target=self._send_loop, daemon=True)
         self._send_t.start()
 
@@ -268,20 +640,43 @@ class WebsocketConnection:
             if msg is None:
                 break
             try:
-                self._process_received_message(json.loads(msg))
+                self._process_received_message(self.codec.decode(msg))
             except:
                 continue
+        self.close()
+
+    def close(self):
         try:
             self.ws.close()
         except:
             pass
         self.active = False
-        if self.send_queue is not None:
-            self.send_queue.put(None)
+        send_queue = self.send_queue
+        if send_queue is not None:
+            send_queue.close()
 
-    def send(self, message):
-        if self.send_queue is not None:
-            self.send_queue.put(message)
+    def send(self, message, key=None, droppable: bool = False, lane: str = "normal", targets: frozenset = None, scope: frozenset = None):
+        """
+        Queue message for sending.
+        :param key: Pending messages with the same key are replaced by this message
+        :param droppable: Message may be dropped if the frontend is resynced with a full render
+        :param lane: Priority class, one of SEND_LANES
+        :param targets: Uids of the views whose elements the message changes, None if unknown, see SendQueue.put()
+        :param scope: Uids of targets and all their ancestors
+        """
+        send_queue = self.send_queue
+        if send_queue is None:
+            return
+        if send_queue.put(message, key, droppable, block=self.backpressure == "block", lane=lane, targets=targets, scope=scope) is True:
+            return
+        if self.backpressure == "coalesce":
+            send_queue.drop()
+            send_queue.put(RESYNC_MESSAGE, key=RESYNC_MESSAGE)
+            if droppable is False:
+                send_queue.put(message, key, lane=lane, targets=targets, scope=scope)
+        else:
+            logging.warning("Send queue full, disconnecting frontend")
+            self.close()
 
     def _process_received_message(self, message):
         if 'call' in message:
@@ -295,20 +690,28 @@ class WebsocketConnection:
                     function = self.parent_instance._function_references.get(functioncall_id)
                     # noinspection PyUnresolvedReferences
                     function_name = "%s.%s" % (function.__self__.__class__.__name__, function.__name__)
-                    return_val = function(*args)
+                    return self._call_handler(message, function, args, function_name)
 
                 elif message['name'] == "call_python_function":
                     functioncall_id = message['args'][0]
                     function = self.parent_instance._function_references.get(functioncall_id)
                     # noinspection PyUnresolvedReferences
                     function_name = "%s.%s" % (function.__self__.__class__.__name__, function.__name__)
-                    return_val = function()
+                    return self._call_handler(message, function, [], function_name)
 
                 elif message['name'] == "frontend_ready":
                     function_name = "frontend_ready"
-                    self.parent_instance.update()
+                    self.parent_instance.update(connection=self)
                     self.parent_instance._on_dom_ready_callback()
 
+                elif message['name'] == "resync":
+                    function_name = "resync"
+                    self.parent_instance.update(connection=self)
+
+                elif message['name'] == "request_update":
+                    function_name = "request_update"
+                    self.parent_instance._request_update(message['args'][0])
+
                 elif message['name'] == "ping":
                     pass
 
@@ -316,27 +719,76 @@ class WebsocketConnection:
                     logging.error("unknown python function '%s'" % message['name'])
 
             except Exception:
-                tb = traceback.format_exc()
-                msg = " Exception in: %s(%s)\n" % (function_name, ("%s" % args)[1:-1])
-                msg += " %s" % tb.replace("\n", "\n  ").strip()
-                self.parent_instance.call_javascript("pyhtmlgui.debug_msg", [msg], skip_results=True)
-                logging.error(msg)
+                self._report_exception(function_name, args)
                 return_val = None
 
-            if not ("skip_results" in message and message["skip_results"] is True):
-                data = json.dumps({'return': message['call'], 'value': return_val}, default=lambda o: None)
-                self.send(data)
+            self._send_return_value(message, return_val)
 
         elif 'return' in message:
             call_id = message['return']
             del message['return']  # remove internal id from result before passing to next level
             try:
-                self.parent_instance.pending_js_results[call_id].result_received(message)
+                self.parent_instance.pending_js_results[call_id].result_received(message, self)
             except:
                 pass
         else:
             logging.error('Invalid message received: %s' % message)
 
+    def _call_handler(self, message, function, args, function_name):
+        """
+        Run python function called by the frontend, in the handler pool if the gui has one, otherwise in this thread
+        """
+        handler_pool = self.parent_instance._parent._handler_pool
+        if handler_pool is None:
+            return self._run_handler(message, function, args, function_name)
+        ordering = self.parent_instance._parent.handler_ordering
+        if ordering == "view":
+            key = ("view", id(getattr(function, "__self__", function)))
+        elif ordering == "instance":
+            key = ("instance", id(self.parent_instance))
+        else:
+            key = None
+        handler_pool.submit(function_name, lambda: self._run_handler(message, function, args, function_name), key)
+
+    def _run_handler(self, message, function, args, function_name):
+        try:
+            with self.parent_instance.send_lane("high"):
+                return_val = function(*args)
+            if inspect.iscoroutine(return_val):  # async def handler, runs on the event loop, the receive loop continues
+                future = asyncio.run_coroutine_threadsafe(return_val, self.parent_instance._parent.get_event_loop())
+                future.add_done_callback(lambda f: self._on_coroutine_done(f, message, function_name, args))
+                return
+        except Exception:
+            self._report_exception(function_name, args)
+            return_val = None
+        self._send_return_value(message, return_val)
+
+    def _on_coroutine_done(self, future, message, function_name, args):
+        try:
+            return_val = future.result()
+        except BaseException:
+            self._report_exception(function_name, args)
+            return_val = None
+        self._send_return_value(message, return_val)
+
+    def _send_return_value(self, message, return_val):
+        if not ("skip_results" in message and message["skip_results"] is True):
+            data = self.codec.encode({'return': message['call'], 'value': return_val})
+            if self.parent_instance._parent.send_priorities is True:
+                self.send(data, lane="high", targets=frozenset())
+            else:
+                self.send(data)
+
+    def _run_result_callback(self, callback: typing.Callable, results: list) -> None:
+        callback(results)
+
+    def _report_exception(self, function_name, args):
+        tb = traceback.format_exc()
+        msg = " Exception in: %s(%s)\n" % (function_name, ("%s" % args)[1:-1])
+        msg += " %s" % tb.replace("\n", "\n  ").strip()
+        self.parent_instance.call_javascript("pyhtmlgui.debug_msg", [msg], skip_results=True)
+        logging.error(msg)
+
     def _send_loop(self):
         while self.active is True:
             message = self.send_queue.get()
@@ -355,33 +807,110 @@ class WebsocketConnection:
 
 
 class JavascriptCallResult:
-    def __init__(self, pyHtmlGuiInstance, call_id, nr_of_expected_results):
+    """
+    Results of a javascript call, one per frontend connection the call was sent to.
+    Call it to wait for the results, pass a callback to receive them asynchronously, or await it in a coroutine.
+    """
+    def __init__(self, pyHtmlGuiInstance, call_id, connections):
         self.instance = pyHtmlGuiInstance
         self.call_id = call_id
-        self._results_expected = nr_of_expected_results
+        self._pending_connections = set(id(connection) for connection in connections)
         self.results = []
         self._callback = None
+        self._waiters = []  # (loop, future) of coroutines awaiting the results
+        self._lock = threading.Lock()
         self._all_results_received_event = threading.Event()
 
-    def result_received(self, result):
-        self.results.append(result)
-        if len(self.results) == self._results_expected:
-            if self._callback is not None:
-                self._callback(self.results)
+    def result_received(self, result, connection=None):
+        with self._lock:
+            if connection is not None:
+                if id(connection) not in self._pending_connections:
+                    return
+                self._pending_connections.discard(id(connection))
+            elif len(self._pending_connections) > 0:
+                self._pending_connections.pop()
+            self.results.append(result)
+            done = len(self._pending_connections) == 0
+        if done is True:
+            self._complete(connection)
+
+    def connection_closed(self, connection):
+        """
+        Connection was closed before it returned a result, complete with the results of the other connections
+        """
+        with self._lock:
+            if id(connection) not in self._pending_connections:
+                return
+            self._pending_connections.discard(id(connection))
+            done = len(self._pending_connections) == 0
+        if done is True:
+            self._complete()
+
+    def _complete(self, connection=None):
+        """
+        :param connection: Connection that received the last result, it runs the callback
+        """
+        with self._lock:
+            if self._all_results_received_event.is_set() is True:
+                return
             self._all_results_received_event.set()
-            self._clear_parent_reference()
+            callback, self._callback = self._callback, None
+            waiters, self._waiters = self._waiters, []
+        if callback is not None:
+            if connection is not None:
+                connection._run_result_callback(callback, self.results)
+            else:
+                callback(self.results)
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(self._resolve_future, future)
+            except RuntimeError:
+                pass  # event loop is closed
+        self._clear_parent_reference()
+
+    @staticmethod
+    def _resolve_future(future):
+        if future.done() is False:
+            future.set_result(True)
 
-    def _get_results_blocking(self):
-        self._all_results_received_event.wait(60)
-        errors = [result["error"] for result in self.results if "error" in result]
+    def _get_values(self):
+        results = list(self.results)
+        errors = [result["error"] for result in results if "error" in result]
         if len(errors) > 0:
-            msg = "%s of %s connected frontends returned an error\n" % (len(errors), len(self.results))
+            msg = "%s of %s connected frontends returned an error\n" % (len(errors), len(results))
             msg += "\n".join(errors)
             raise Exception(msg)
-        return [result["value"] for result in self.results]
+        return [result["value"] for result in results]
+
+    def _get_results_blocking(self, timeout: float = 60):
+        self._all_results_received_event.wait(timeout)
+        return self._get_values()
+
+    async def wait(self, timeout: float = 60, partial: bool = True) -> list:
+        """
+        Wait for the results without blocking the event loop
+        :param timeout: Seconds to wait for all connections to return a result
+        :param partial: On timeout return the results received so far, if False raise asyncio.TimeoutError
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._all_results_received_event.is_set() is False:
+                self._waiters.append((loop, future))
+            else:
+                future.set_result(True)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if partial is False:
+                raise
+        return self._get_values()
+
+    def __await__(self):
+        return self.wait().__await__()
 
     def removed_by_parent(self):
-        self._all_results_received_event.set()
+        self._complete()
 
     def _clear_parent_reference(self):
         try:
@@ -389,14 +918,19 @@ class JavascriptCallResult:
         except:
             pass
 
-    def __call__(self, callback: typing.Union[typing.Callable, None]  = None):
+    def __call__(self, callback: typing.Union[typing.Callable, None] = None, timeout: float = 60):
+        """
+        :param callback: Receive results asynchronously, called with the list of results
+        :param timeout: If no callback is given, seconds to wait for the results, results received so far are returned on timeout
+        """
         if callback is None:
-            r = self._get_results_blocking()
+            r = self._get_results_blocking(timeout)
             self._clear_parent_reference()
             return r
         else:
-            if self._all_results_received_event.is_set() is True:
-                callback(self._get_results_blocking())
-                self._clear_parent_reference()
-            else:
-                self._callback = callback
+            with self._lock:
+                if self._all_results_received_event.is_set() is False:
+                    self._callback = callback
+                    return
+            callback(self._get_results_blocking())
+            self._clear_parent_reference()
@@ -0,0 +1,238 @@
+from __future__ import annotations
+import os
+import re
+import sys
+import inspect
+import importlib
+import marshal
+import hashlib
+import threading
+import typing
+import jinja2
+import jinja2.bccache
+from .dependencyTracking import DependencyTrackingEnvironment
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pyhtmlgui.pyhtmlgui import PyHtmlGui
+    from pyhtmlgui.view.pyhtmlview import PyHtmlView
+
+
+class TemplateCache:
+    """
+    Compiled view templates, shared by all instances of a PyHtmlGui.
+    Templates are keyed by module and qualified name of the view class, so classes with the same name in different modules don't collide.
+    """
+    def __init__(self, parent: PyHtmlGui, cache_dir: str = None):
+        """
+        :param cache_dir: Directory with templates compiled by precompile(), None to compile all templates at runtime
+        """
+        self._parent = parent
+        self._template_env = jinja2.Environment(loader=parent.template_loader, autoescape=jinja2.select_autoescape())
+        self._tracking_template_env = DependencyTrackingEnvironment(loader=parent.template_loader, autoescape=jinja2.select_autoescape())
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._bytecode = load_bytecode(cache_dir) if cache_dir is not None else {}
+
+    @staticmethod
+    def get_key(view_class: typing.Type[PyHtmlView]) -> str:
+        return "%s.%s" % (view_class.__module__, view_class.__qualname__)
+
+    def get(self, view_class: typing.Type[PyHtmlView], force_reload: bool = False) -> jinja2.Template:
+        """
+        Receive compiled template of view_class, compile on first use
+        :param view_class: A class that Inherits from PyHtmlView
+        :param force_reload: Force reloading of template
+        """
+        key = self.get_key(view_class)
+        if force_reload is False:
+            try:
+                return self._templates[key]
+            except KeyError:
+                pass
+
+        with self._lock:
+            if force_reload is False and key in self._templates:  # compiled by other thread while we waited
+                return self._templates[key]
+            self._templates[key] = self._compile(view_class, key)
+            return self._templates[key]
+
+    def clear(self, keys: typing.Iterable[str] = None) -> None:
+        """
+        Remove compiled templates, so they are loaded again on next use
+        :param keys: Keys as returned by get_key(), None to remove all templates
+        """
+        with self._lock:
+            if keys is None:
+                self._templates = {}
+            else:
+                for key in keys:
+                    try:
+                        del self._templates[key]
+                    except KeyError:
+                        pass
+
+    def _compile(self, view_class: typing.Type[PyHtmlView], key: str) -> jinja2.Template:
+        if view_class.TEMPLATE_FILE is not None:  # load from file
+            file_to_monitor = self._template_env.get_template(view_class.TEMPLATE_FILE).filename
+            string_to_render = open(file_to_monitor, "r").read()
+        else:  # load from class
+            if self._parent.auto_reload is False:
+                string_to_render = view_class.TEMPLATE_STR
+                file_to_monitor = None
+            else:
+                module_name = view_class.__module__
+                if module_name is None or module_name == str.__class__.__module__:
+                    module_fullname = view_class.__qualname__  # Avoid reporting __builtin__
+                else:
+                    module_fullname = module_name + '.' + view_class.__qualname__
+
+                try:
+                    file_to_monitor = os.path.abspath(inspect.getfile(view_class))
+                except Exception:  # in case its in main. this may be a bug in inspect
+                    file_to_monitor = os.path.abspath(sys.argv[0])
+
+                if module_name == "__main__":
+                    name = os.path.splitext(os.path.basename(file_to_monitor))[0]
+                    module = __import__(name)
+                    importlib.reload(module)  # reload should work on non complex objects in __main__, but not for more
+                    for comp in module_fullname.split(".")[1:]:
+                        module = getattr(module, comp)
+                else:
+                    loader = importlib.machinery.SourceFileLoader(module_name, file_to_monitor)
+                    # noinspection PyUnresolvedReferences
+                    spec = importlib.util.spec_from_loader(loader.name, loader)
+                    # noinspection PyUnresolvedReferences
+                    module = importlib.util.module_from_spec(spec)
+                    loader.exec_module(module)
+                    for comp in view_class.__qualname__.split("."):
+                        module = getattr(module, comp)
+                string_to_render = module.TEMPLATE_STR
+
+        if self._parent.auto_reload is True:
+            self._parent._add_file_to_monitor(file_to_monitor, key)
+
+        template_env = self._tracking_template_env if view_class.TRACK_DEPENDENCIES is True else self._template_env
+        code = self._bytecode.get(get_bytecode_filename(key, string_to_render))
+        if code is not None:  # precompiled, skip preparing and compiling
+            return template_env.template_class.from_code(template_env, code, template_env.make_globals(None))
+
+        string_to_render = self.prepare_template(string_to_render)
+
+        try:
+            return template_env.from_string(string_to_render)
+        except Exception as e:
+            msg = "Failed to load Template "
+            if view_class.TEMPLATE_FILE is not None:
+                msg += "from File '%s': " % view_class.TEMPLATE_FILE
+            else:
+                msg += "from Class '%s': " % key
+            msg += " %s" % e
+            raise Exception(msg)
+
+    @staticmethod
+    def prepare_template(template: str) -> str:
+        """
+            Replace onclick="pyview.my_function(arg1,arg2)"
+            with    onclick="pyhtmlgui.call({{_create_py_function_reference(pyview.my_function)}}, arg1, arg2)
+        """
+        parts = re.split('({{|}}|{%|%})', template)
+        index = 0
+        while index < len(parts):
+            if parts[index] == "{{" or parts[index] == "{%" :
+                parts[index] = "%s%s%s" % (parts[index] , parts[index+1], parts[index+2])
+                del parts[index+ 1]
+                del parts[index+ 1]
+            index += 1
+
+        new_parts = []
+        for i, part in enumerate(parts):
+            if part.startswith("{{") or part.startswith("{%") or part.find("pyview.") == -1:
+                new_parts.append(part)
+            else:
+                # noinspection RegExpSingleCharAlternation
+                subparts = re.split(r'(>| |\(|=|\"|\'|\n|\r|\t|;)(pyview.[a-zA-Z0-9_.]+\()', part)
+                for x, subpart in enumerate(subparts):
+                    if subpart.startswith("pyview."):
+                        subpart = subpart.replace("(", ")}}, ", 1)
+                        subparts[x] = "pyhtmlgui.call({{_create_py_function_reference(%s" % subpart
+                for sp in subparts:
+                    new_parts.append(sp)
+        return "".join(new_parts).replace(r'\pyview.', 'pyview.')
+
+
+def get_bytecode_filename(key: str, source: str) -> str:
+    """
+    Name of precompiled template file, the checksum makes sure changed templates are not loaded from cache
+    """
+    return "%s-%s.jinjac" % (key, hashlib.sha1(source.encode("utf-8")).hexdigest())
+
+
+def load_bytecode(cache_dir: str) -> dict:
+    """
+    Load all precompiled templates from cache_dir
+    :return: Dict of filename -> code object
+    """
+    bytecode = {}
+    if not os.path.isdir(cache_dir):
+        return bytecode
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(".jinjac"):
+            continue
+        with open(os.path.join(cache_dir, filename), "rb") as f:
+            data = f.read()
+        if not data.startswith(jinja2.bccache.bc_magic):  # compiled by other jinja or python version
+            continue
+        try:
+            bytecode[filename] = marshal.loads(data[len(jinja2.bccache.bc_magic):])
+        except Exception:
+            pass
+    return bytecode
+
+
+def get_view_classes(view_class: typing.Type[PyHtmlView] = None) -> list:
+    """
+    Return view_class and all its subclasses that have a template, default is all loaded PyHtmlView classes
+    """
+    if view_class is None:
+        from pyhtmlgui.view.pyhtmlview import PyHtmlView
+        view_class = PyHtmlView
+    view_classes = []
+    to_check = [view_class]
+    while len(to_check) > 0:
+        cls = to_check.pop(0)
+        if cls not in view_classes:
+            view_classes.append(cls)
+            to_check.extend(cls.__subclasses__())
+    return [cls for cls in view_classes if cls.TEMPLATE_FILE is not None or cls.TEMPLATE_STR is not None]
+
+
+def precompile(cache_dir: str, view_classes: typing.Iterable[typing.Type[PyHtmlView]] = None, template_dir: str = None) -> list:
+    """
+    Compile templates of view classes and store them in cache_dir, pass cache_dir as template_cache_dir to PyHtmlGui to use them.
+    :param cache_dir: Output directory
+    :param view_classes: View classes to compile, default is all loaded subclasses of PyHtmlView
+    :param template_dir: Template dir for views that use TEMPLATE_FILE, same as PyHtmlGui template_dir
+    :return: List of compiled templates keys
+    """
+    if view_classes is None:
+        view_classes = get_view_classes()
+    loader = jinja2.FileSystemLoader(searchpath=[] if template_dir is None else [os.path.abspath(template_dir)])
+    template_env = jinja2.Environment(loader=loader, autoescape=jinja2.select_autoescape())
+    os.makedirs(cache_dir, exist_ok=True)
+
+    compiled = []
+    for view_class in view_classes:
+        key = TemplateCache.get_key(view_class)
+        if view_class.TEMPLATE_FILE is not None:
+            with open(template_env.get_template(view_class.TEMPLATE_FILE).filename, "r") as f:
+                source = f.read()
+        else:
+            source = view_class.TEMPLATE_STR
+        try:
+            code = template_env.compile(TemplateCache.prepare_template(source))
+        except Exception as e:
+            raise Exception("Failed to compile Template of '%s': %s" % (key, e))
+        with open(os.path.join(cache_dir, get_bytecode_filename(key, source)), "wb") as f:
+            f.write(jinja2.bccache.bc_magic + marshal.dumps(code))
+        compiled.append(key)
+    return compiled
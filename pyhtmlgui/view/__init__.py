@@ -1,3 +1,5 @@
 from .observableListView import ObservableListView
 from .observableDictView import ObservableDictView
 from .pyhtmlview import PyHtmlView
+from .virtualListView import VirtualListView
+from .pagedView import PagedListView, PagedDictView
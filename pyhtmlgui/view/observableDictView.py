@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import types
+import bisect
+import itertools
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pyhtmlgui.lib.observableDict import ObservableDict
@@ -30,6 +32,9 @@ class ObservableDictView(PyHtmlView):
         self._kwargs = kwargs
         self._wrapped_data = {}
         self._wrapped_data_lock = Lock()
+        self._sorted_values = []  # (sort value, insert number) of items in _sorted_items, ascending
+        self._sorted_items = []
+        self._insert_number = itertools.count()
         self.sort_key = sort_key
         self.sort_reverse = sort_reverse
         super().__init__(subject, parent)
@@ -40,18 +45,53 @@ class ObservableDictView(PyHtmlView):
         self._wrapped_data_lock.acquire()
         super().set_visible(visible)
         self._wrapped_data = {}
+        self._sorted_values = []
+        self._sorted_items = []
         if self.is_visible is True:
             # is we were invisible, we might have missed add/delete events, so recreate our data wrapper
             for key, item in self.subject.items():
                 self._wrapped_data[key] = self._create_item(item, key)
+                self._add_sorted(self._wrapped_data[key])
         self._wrapped_data_lock.release()
 
     def get_items(self) -> list:
-        items = [item for key, item in self._wrapped_data.items()]
-        if self.sort_key is None:
-            return sorted(items, key=lambda x: x.element_key())
-        else:
-            return sorted(items, key=self.sort_key, reverse=self.sort_reverse)
+        if self.sort_key is not None:
+            self._resort()  # sort_key values may have changed since items were inserted
+        if self.sort_key is not None and self.sort_reverse is True:
+            return self._sorted_items[::-1]
+        return list(self._sorted_items)
+
+    def _get_sort_value(self, obj):
+        return obj.element_key() if self.sort_key is None else self.sort_key(obj)
+
+    def _add_sorted(self, obj) -> int:
+        """
+        Insert obj at its sorted position, return its index in the dom
+        """
+        obj._sort_value = (self._get_sort_value(obj), next(self._insert_number))
+        index = bisect.bisect_right(self._sorted_values, obj._sort_value)
+        self._sorted_values.insert(index, obj._sort_value)
+        self._sorted_items.insert(index, obj)
+        if self.sort_key is not None and self.sort_reverse is True:
+            return len(self._sorted_items) - 1 - index
+        return index
+
+    def _remove_sorted(self, obj) -> None:
+        index = bisect.bisect_left(self._sorted_values, obj._sort_value)
+        if index >= len(self._sorted_items) or self._sorted_items[index] is not obj:
+            index = self._sorted_items.index(obj)
+        del self._sorted_values[index]
+        del self._sorted_items[index]
+
+    def _resort(self) -> None:
+        values = [(self._get_sort_value(obj), obj._sort_value[1]) for obj in self._sorted_items]
+        if any(values[i] > values[i + 1] for i in range(len(values) - 1)):
+            pairs = sorted(zip(values, self._sorted_items), key=lambda x: x[0])
+            values = [value for value, obj in pairs]
+            self._sorted_items = [obj for value, obj in pairs]
+        for value, obj in zip(values, self._sorted_items):
+            obj._sort_value = value
+        self._sorted_values = values
 
     def _create_item(self, item, key):
         obj = self._item_class(item, self, **self._kwargs)
@@ -59,38 +99,56 @@ class ObservableDictView(PyHtmlView):
         return obj
 
     def _on_subject_updated(self, source, **kwargs) -> None:
+        if kwargs.get("action") == "batch":  # changes collected by ObservableDict.batch(), send them in one message
+            with self._instance.batched_calls():
+                for change in kwargs["changes"]:
+                    self._on_subject_updated(source, **change)
+            return
         try:
             self._wrapped_data_lock.acquire()
 
             if kwargs["action"] == "setitem":
-                if kwargs["key"] in self._wrapped_data:
-                    self._wrapped_data[kwargs["key"]].delete()  # unrender
-                obj = self._create_item(kwargs["item"], kwargs["key"])
-                self._wrapped_data[kwargs["key"]] = obj
-                index = list(self._wrapped_data.keys()).index(kwargs["key"])
-                if self.insert_element(index, obj) is False:
-                    del self._wrapped_data[kwargs["key"]]
+                self._set_item(kwargs["key"], kwargs["item"])
 
             if kwargs["action"] == "update":
-                for kv in kwargs["items"]:
-                    key, item = kv
-                    obj = self._create_item(item, kwargs["key"])
-                    if key in self._wrapped_data:
-                        self._wrapped_data[key].delete()  # unrender
-                    self._wrapped_data[key] = obj
-                    index = list(self._wrapped_data.keys()).index(kwargs["key"])
-                    if self.insert_element(index, obj) is False:
-                        del self._wrapped_data[kwargs["key"]]
+                with self._instance.batched_calls():
+                    for kv in kwargs["items"]:
+                        key, item = kv
+                        self._set_item(key, item)
 
             if kwargs["action"] in ["delitem", "pop", "popitem"]:
-                self._wrapped_data[kwargs["key"]].delete()
-                del self._wrapped_data[kwargs["key"]]
+                if kwargs["key"] in self._wrapped_data:  # item view may be gone already if its subject died
+                    self._wrapped_data[kwargs["key"]].delete()
 
             if kwargs["action"] == "clear":
-                for key, item in self._wrapped_data.items():
+                for item in list(self._wrapped_data.values()):
                     item.delete()
                 self._wrapped_data.clear()
+                self._sorted_values = []
+                self._sorted_items = []
                 self.update()
 
         finally:
             self._wrapped_data_lock.release()
+
+    def _set_item(self, key, item) -> None:
+        if key in self._wrapped_data:
+            self._wrapped_data[key].delete()  # unrender
+        obj = self._create_item(item, key)
+        self._wrapped_data[key] = obj
+        if self.insert_element(self._add_sorted(obj), obj) is False:
+            obj.delete(remove_from_dom=False)
+
+    def _remove_child(self, child: PyHtmlView) -> None:
+        """
+        Item views remove themselves if deleted, also if their subject died before we received the event for it,
+        so following inserts compute their index from what is actually in the dom
+        """
+        super()._remove_child(child)
+        try:
+            key = child.element_key()
+        except AttributeError:
+            return
+        if self._wrapped_data.get(key) is child:
+            del self._wrapped_data[key]
+            self._remove_sorted(child)
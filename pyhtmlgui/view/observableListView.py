@@ -4,7 +4,8 @@ if TYPE_CHECKING:
     from pyhtmlgui.lib.observableList import ObservableList
 import types
 import typing
-from threading import Lock
+import bisect
+from threading import RLock
 from .pyhtmlview import PyHtmlView
 
 
@@ -29,7 +30,11 @@ class ObservableListView(PyHtmlView):
         self.DOM_ELEMENT = dom_element
         self._kwargs = kwargs
         self._wrapped_data = []
-        self._wrapped_data_lock = Lock()
+        self._wrapped_data_lock = RLock()  # update() and render() are called while it is held
+        self._indexed_until = 0  # element indices of _wrapped_data before this position are up to date
+        self._hidden_count = 0  # number of items in _wrapped_data excluded by filter_function
+        self._sorted_values = []  # sort values of items in _sorted_items, ascending, if sort_key is set
+        self._sorted_items = []  # not filtered items, ordered by sort_key
         self.sort_key = sort_key
         self.sort_reverse = sort_reverse
         self.filter_function = filter_function
@@ -38,11 +43,19 @@ class ObservableListView(PyHtmlView):
         super().__init__(subject, parent)
 
     def get_items(self) -> list:
-        data = [w for w in self._wrapped_data if self.filter_function(w) is False]
-        if self.sort_key is None:
-            return data
-        else:
-            return sorted(data, key=self.sort_key, reverse=self.sort_reverse)
+        return self._get_dom_items()
+
+    def render(self) -> typing.Union[str, None]:
+        """
+        Evaluate filter_function and sort_key of all items again before the template renders, their results may depend on
+        state that changed since the items were inserted, like attributes of a parent that renders us again
+        """
+        if self.is_visible is True:
+            with self._wrapped_data_lock:
+                self._refresh_filter()
+                if self.sort_key is not None:
+                    self._resort()
+        return super().render()
 
     def set_visible(self, visible: bool) -> None:
         if self.is_visible == visible:  # not changed
@@ -51,26 +64,199 @@ class ObservableListView(PyHtmlView):
         super().set_visible(visible)
         for data in self._wrapped_data:
             data.delete(remove_from_dom=False)
-        self._wrapped_data = []
+        self._clear_items()
         if self.is_visible is True:  # was set to invisible
             for item in self.subject:
-                self._wrapped_data.append(self._create_item(item))
+                self._add_item(len(self._wrapped_data), self._create_item(item))
         self._wrapped_data_lock.release()
 
     def _create_item(self, item):
         obj = self._item_class(item, self, **self._kwargs)
         obj.element_index = types.MethodType(lambda x: x.parent.get_element_index(x), obj)
         obj.element_index_used = False
+        obj._element_index = None
+        obj._filtered = self.filter_function(obj) is not False
         return obj
 
     def _recreate(self):
         for data in self._wrapped_data:
             data.delete(remove_from_dom=False)
-        self._wrapped_data = []
+        self._clear_items()
         for item in self.subject:
-            self._wrapped_data.append(self._create_item(item))
+            self._add_item(len(self._wrapped_data), self._create_item(item))
+
+    def _clear_items(self):
+        self._wrapped_data = []
+        self._indexed_until = 0
+        self._hidden_count = 0
+        self._sorted_values = []
+        self._sorted_items = []
+
+    def _add_item(self, index, obj) -> typing.Union[int, None]:
+        """
+        Insert obj into _wrapped_data at index, return its index in the dom or None if it is filtered
+        """
+        self._wrapped_data.insert(index, obj)
+        self._indices_changed(index)
+        if obj._filtered is True:
+            self._hidden_count += 1
+            return None
+        if self.sort_key is None:
+            return self._get_dom_index(index)
+        return self._add_sorted(obj)
+
+    def _remove_item(self, index) -> None:
+        obj = self._wrapped_data.pop(index)
+        self._indices_changed(index)
+        if obj._filtered is True:
+            self._hidden_count -= 1
+        elif self.sort_key is not None:
+            self._remove_sorted(obj)
+
+    def _add_sorted(self, obj) -> int:
+        """
+        Insert obj at its sorted position, return its index in the dom
+        """
+        obj._sort_value = self.sort_key(obj)
+        position = bisect.bisect_right(self._sorted_values, obj._sort_value)
+        self._sorted_values.insert(position, obj._sort_value)
+        self._sorted_items.insert(position, obj)
+        if self.sort_reverse is True:
+            return len(self._sorted_items) - 1 - position
+        return position
+
+    def _remove_sorted(self, obj) -> None:
+        position = bisect.bisect_left(self._sorted_values, obj._sort_value)
+        if position >= len(self._sorted_items) or self._sorted_items[position] is not obj:
+            position = self._sorted_items.index(obj)
+        del self._sorted_values[position]
+        del self._sorted_items[position]
+
+    def _get_dom_index(self, index) -> int:
+        if self._hidden_count == 0:
+            return index
+        return sum(1 for w in self._wrapped_data[:index] if w._filtered is False)
+
+    def _get_dom_items(self) -> list:
+        """
+        Not filtered items in the order they are currently shown in the dom
+        """
+        if self.sort_key is not None:
+            return self._sorted_items[::-1] if self.sort_reverse is True else list(self._sorted_items)
+        return [w for w in self._wrapped_data if w._filtered is False]
+
+    def _refresh_filter(self) -> None:
+        filtered = [self.filter_function(obj) is not False for obj in self._wrapped_data]
+        if any(f != obj._filtered for f, obj in zip(filtered, self._wrapped_data)):
+            self._apply_filter(filtered)
+
+    def _apply_filter(self, filtered: list) -> None:
+        """
+        Set filter results of all items in _wrapped_data, items that stay visible keep their order
+        """
+        if self.sort_key is not None:
+            self._resort()
+        for obj, is_filtered in zip(self._wrapped_data, filtered):
+            if is_filtered == obj._filtered:
+                continue
+            obj._filtered = is_filtered
+            if is_filtered is True:
+                self._hidden_count += 1
+                if self.sort_key is not None:
+                    self._remove_sorted(obj)
+            else:
+                self._hidden_count -= 1
+                if self.sort_key is not None:
+                    self._add_sorted(obj)
+
+    def set_filter(self, filter_function: typing.Callable = None) -> None:
+        """
+        Replace filter_function. Only rows that are shown or hidden by the new filter are inserted into or removed from the dom,
+        the other rows are not rendered again.
+        :param filter_function: Called with item view, return True to hide item. None to show all items
+        """
+        with self._wrapped_data_lock:
+            self.filter_function = filter_function if filter_function is not None else lambda x: False
+            if self.is_visible is False:
+                return
+            old_items = self._get_dom_items()
+            filtered = [self.filter_function(obj) is not False for obj in self._wrapped_data]  # evaluate all before changing anything
+            self._apply_filter(filtered)
+            new_items = self._get_dom_items()
+
+            old_ids = set(id(obj) for obj in old_items)
+            new_ids = set(id(obj) for obj in new_items)
+            hidden = [obj for obj in old_items if id(obj) not in new_ids]
+            shown = [(index, obj) for index, obj in enumerate(new_items) if id(obj) not in old_ids]
+            if len(hidden) == 0 and len(shown) == 0:
+                return
+            if len(hidden) > len(new_items):  # less work to render remaining rows
+                self.update()
+                return
+            with self._instance.batched_calls():
+                for obj in hidden:
+                    self._invalidate_render_cache()
+                    self._instance.call_javascript("pyhtmlgui.remove_element", [obj.uid], skip_results=True)
+                    obj.set_visible(False)
+                for index, obj in shown:  # in dom order, so all rows before index are in place
+                    self.insert_element(index, obj)
+
+    def _resort(self) -> bool:
+        """
+        Sort items again if their sort_key values changed, return True if order changed
+        """
+        values = [self.sort_key(obj) for obj in self._sorted_items]
+        changed = any(values[i] > values[i + 1] for i in range(len(values) - 1))
+        if changed is True:
+            pairs = sorted(zip(values, self._sorted_items), key=lambda x: x[0])
+            values = [value for value, obj in pairs]
+            self._sorted_items = [obj for value, obj in pairs]
+        for value, obj in zip(values, self._sorted_items):
+            obj._sort_value = value
+        self._sorted_values = values
+        return changed
+
+    def resort(self) -> None:
+        """
+        Move items to their new position if sort_key values changed, items are moved in the dom, not rendered again
+        """
+        with self._wrapped_data_lock:
+            if self.sort_key is None or self.is_visible is False:
+                return
+            dom_items = self._get_dom_items()
+            if self._resort() is True:
+                self._move_elements(dom_items, self._get_dom_items())
+
+    def _move_elements(self, old_items: list, new_items: list) -> None:
+        """
+        Reorder dom from old_items to new_items with a minimal number of moves, items that are part of
+        the longest increasing subsequence of old positions stay where they are
+        """
+        old_positions = {id(obj): position for position, obj in enumerate(old_items)}
+        sequence = [old_positions[id(obj)] for obj in new_items]
+        stable = set(longest_increasing_subsequence(sequence))
+        present = FenwickTree(len(sequence))  # old dom slots still occupied by items that were not moved
+        moved = 0
+        last_stable = None
+        with self._instance.batched_calls():
+            for position, obj in enumerate(new_items):
+                if sequence[position] in stable:
+                    last_stable = sequence[position]
+                    continue
+                present.add(sequence[position], -1)  # js removes the element before inserting at index
+                if last_stable is None:
+                    index = moved  # all items before us have been moved to the front already
+                else:  # right after our predecessor, that is behind the last stable item and all items moved so far
+                    index = present.prefix_sum(last_stable) + 1 + moved
+                self.move_element(index, obj)
+                moved += 1
 
     def _on_subject_updated(self, source, **kwargs):
+        if kwargs.get("action") == "batch":  # changes collected by ObservableList.batch(), send them in one message
+            with self._instance.batched_calls():
+                for change in kwargs["changes"]:
+                    self._on_subject_updated(source, **change)
+            return
         try:
             self._wrapped_data_lock.acquire()
             if "action" not in kwargs:
@@ -78,68 +264,165 @@ class ObservableListView(PyHtmlView):
                 self.update()
 
             elif kwargs["action"] in ["append", "insert"]:
+                index = kwargs["index"]
+                if index < 0:  # list.insert with negative index
+                    index = max(0, len(self._wrapped_data) + index)
                 obj = self._create_item(kwargs["item"])
-                self._wrapped_data.insert(kwargs["index"], obj)
-                if self.filter_function(obj) is False:
-                    if self.insert_element(kwargs["index"], obj) is False:
-                        self._wrapped_data.remove(obj)
+                dom_index = self._add_item(index, obj)
+                if dom_index is not None:
+                    if self.insert_element(dom_index, obj) is False:
+                        self._remove_item(index)
                     else:  # update items that use the loop index
-                        for item in self._wrapped_data[kwargs["index"] + 1:]:
-                            if item.element_index_used is True:
-                                item.update()
+                        with self._instance.batched_calls():
+                            for item in self._wrapped_data[index + 1:]:
+                                if item.element_index_used is True:
+                                    item.update()
 
             elif kwargs["action"] == "setitem":
-                self._wrapped_data[kwargs["index"]].delete()  # unrender
+                index = kwargs["index"] % len(self._wrapped_data)  # list[-1] = item
+                self._wrapped_data[index].delete()  # unrender
+                self._remove_item(index)
                 obj = self._create_item(kwargs["new_item"])
-                self._wrapped_data[kwargs["index"]] = obj
-                if self.filter_function(obj) is False:
-                    if self.insert_element(kwargs["index"], obj) is False:
-                        self._wrapped_data.remove(obj)
+                dom_index = self._add_item(index, obj)
+                if dom_index is not None:
+                    if self.insert_element(dom_index, obj) is False:
+                        self._remove_item(index)
 
             elif kwargs["action"] == "extend":
-                current_index = kwargs["index"]
-                for item in kwargs["items"]:
+                index = kwargs["index"]
+                runs = []  # [dom index, items], items shown next to each other are inserted with one call
+                for offset, item in enumerate(kwargs["items"]):
                     obj = self._create_item(item)
-                    self._wrapped_data.insert(current_index, obj)
-                    if self.filter_function(obj) is False:
-                        if self.insert_element(kwargs["index"], obj) is False:
-                            self._wrapped_data.remove(obj)
-                        else:
-                            current_index += 1
-                [item.update() for item in self._wrapped_data[current_index:] if item.element_index_used is True]
+                    dom_index = self._add_item(index + offset, obj)
+                    if dom_index is None:
+                        continue
+                    if len(runs) > 0 and runs[-1][0] + len(runs[-1][1]) == dom_index:
+                        runs[-1][1].append(obj)
+                    else:
+                        runs.append([dom_index, [obj]])
+                with self._instance.batched_calls():
+                    failed = []
+                    for dom_index, objs in runs:
+                        failed.extend(self.insert_elements(dom_index, objs))
+                    if len(failed) > 0:  # dom indices of following items are wrong, render everything again
+                        for obj in failed:
+                            self._remove_item(self._wrapped_data.index(obj))
+                        self.update()
+                    [item.update() for item in self._wrapped_data[index + len(kwargs["items"]) - len(failed):] if item.element_index_used is True]
 
             elif kwargs["action"] in ["remove", "pop", "delitem"]:
-                self._wrapped_data[kwargs["index"]].delete()
-                del self._wrapped_data[kwargs["index"]]
-                [item.update() for item in self._wrapped_data[kwargs["index"]:] if item.element_index_used is True]
+                index = kwargs["index"] % len(self._wrapped_data)  # del list[-1], list.pop(-2)
+                self._wrapped_data[index].delete()
+                self._remove_item(index)
+                with self._instance.batched_calls():
+                    [item.update() for item in self._wrapped_data[index:] if item.element_index_used is True]
 
-            elif kwargs["action"] == "sort":
-                recreate = False
+            elif kwargs["action"] in ["sort", "reverse"]:
                 sorting = {}
                 for index, item in enumerate(self.subject):
-                    if item != self._wrapped_data[index].subject:
-                        recreate = True
-                    sorting[id(item)] = index
-                if recreate is True:
-                    for data in self._wrapped_data:
-                        data.__newindex = sorting[id(data.subject)]
-                    self._wrapped_data.sort(key=lambda x:x.__newindex)
+                    sorting.setdefault(id(item), []).append(index)
+                new_indices = []
+                for data in reversed(self._wrapped_data):  # same item multiple times keeps its order, use last index first
+                    indices = sorting.get(id(data.subject))
+                    if not indices:
+                        break
+                    new_indices.append(indices.pop())
+                if len(new_indices) != len(self._wrapped_data) or len(self._wrapped_data) != len(self.subject):
+                    self._recreate()  # we missed changes, render again
                     self.update()
-
-            elif kwargs["action"] == "reverse":
-                self._wrapped_data.reverse()
-                self.update()
+                    return
+                dom_items = self._get_dom_items()
+                for data, new_index in zip(reversed(self._wrapped_data), new_indices):
+                    data.__newindex = new_index
+                self._wrapped_data.sort(key=lambda x: x.__newindex)
+                self._indices_changed(0)
+                if self.sort_key is None:  # dom shows list order, move elements
+                    self._move_elements(dom_items, self._get_dom_items())
+                with self._instance.batched_calls():
+                    [item.update() for item in self._wrapped_data if item.element_index_used is True]
 
             elif kwargs["action"] == "clear":
                 for data in self._wrapped_data:
                     data.delete(remove_from_dom=False)
-                self._wrapped_data.clear()
+                self._clear_items()
                 self.update()
 
         finally:
             self._wrapped_data_lock.release()
 
+    def _indices_changed(self, index):
+        self._indexed_until = min(self._indexed_until, index)
+
+    def _update_indices(self, start):
+        for index in range(start, len(self._wrapped_data)):
+            self._wrapped_data[index]._element_index = index
+        self._indexed_until = len(self._wrapped_data)
+
     def get_element_index(self, element):
+        """
+        Index of element in list. Indices are renumbered once after the list changed, not on every call,
+        so rendering a list where each row shows its index stays linear.
+        """
         element.element_index_used = True
-        return self._wrapped_data.index(element)
+        for start in (None, self._indexed_until, 0):
+            if start is not None:
+                self._update_indices(start)
+            index = element._element_index
+            if index is not None and index < len(self._wrapped_data) and self._wrapped_data[index] is element:
+                return index
+        raise ValueError("element is not in list")
+
+
+
+def longest_increasing_subsequence(sequence: list) -> list:
+    """
+    Return values of one longest strictly increasing subsequence of sequence in O(n log n)
+    """
+    tails = []  # tails[i] is the position of the smallest last value of an increasing subsequence of length i + 1
+    tail_values = []
+    previous = [None] * len(sequence)
+    for position, value in enumerate(sequence):
+        length = bisect.bisect_left(tail_values, value)
+        if length > 0:
+            previous[position] = tails[length - 1]
+        if length == len(tails):
+            tails.append(position)
+            tail_values.append(value)
+        else:
+            tails[length] = position
+            tail_values[length] = value
+    result = []
+    position = tails[-1] if len(tails) > 0 else None
+    while position is not None:
+        result.append(sequence[position])
+        position = previous[position]
+    return result[::-1]
+
+
+class FenwickTree:
+    """
+    Prefix sums over size slots that are all 1 initially, with O(log n) updates
+    """
+    def __init__(self, size: int):
+        self._tree = [0] * (size + 1)
+        for i in range(1, size + 1):  # build in O(n)
+            self._tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+
+    def add(self, slot: int, value: int) -> None:
+        slot += 1
+        while slot < len(self._tree):
+            self._tree[slot] += value
+            slot += slot & -slot
 
+    def prefix_sum(self, slot: int) -> int:
+        """
+        Sum of slots before slot
+        """
+        result = 0
+        while slot > 0:
+            result += self._tree[slot]
+            slot -= slot & -slot
+        return result
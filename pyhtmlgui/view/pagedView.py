@@ -0,0 +1,355 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pyhtmlgui.lib.observableList import ObservableList
+    from pyhtmlgui.lib.observableDict import ObservableDict
+import abc
+import typing
+import bisect
+import math
+import types
+import collections
+from threading import RLock
+from markupsafe import Markup
+from .pyhtmlview import PyHtmlView
+
+
+class PagedView(PyHtmlView, metaclass=abc.ABCMeta):
+    """
+    Base class of PagedListView and PagedDictView. Only item views of the current page exist, rendered html of recently visited
+    pages is kept, so going back to them sends the cached html without rendering.
+    Changes of the collection after the current page only update the page info.
+    """
+    TEMPLATE_STR = '''
+        <div id="{{ pyview.uid }}_rows">
+            {% for item in pyview.get_items() %}
+                {{ item.render() }}
+            {% endfor %}
+        </div>
+        <div class="pyhtmlgui-pager">
+            <button onclick="pyview.previous_page()">&lt;</button>
+            {{ pyview.render_page_info() }}
+            <button onclick="pyview.next_page()">&gt;</button>
+        </div>
+    '''
+    PAGE_INFO = "Page {page} of {page_count}, {count} items"
+
+    def __init__(self,
+                 subject        : typing.Union[ObservableList, ObservableDict],
+                 parent         : PyHtmlView,
+                 item_class     : type[PyHtmlView],
+                 page_size      : int = 50,
+                 page_cache_size: int = 5,
+                 dom_element    : str = PyHtmlView.DOM_ELEMENT,
+                 **kwargs):
+        """
+        :param page_size: Number of items on one page
+        :param page_cache_size: Number of recently visited pages whose rendered html is kept
+        """
+        self._item_class = item_class
+        self.DOM_ELEMENT = dom_element
+        self._kwargs = kwargs
+        self.page = 0
+        self.page_size = page_size
+        self.page_cache_size = page_cache_size
+        self.count = 0
+        self._page_views = []
+        self._page_cache = collections.OrderedDict()  # page -> PageCacheEntry, least recently visited first
+        self._page_lock = RLock()
+        super().__init__(subject, parent)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, math.ceil(self.count / self.page_size))
+
+    def get_items(self) -> list:
+        return list(self._page_views)
+
+    def render_page_info(self) -> Markup:
+        info = self.PAGE_INFO.format(page=self.page + 1, page_count=self.page_count, count=self.count)
+        return Markup('<span id="%s_info">%s</span>' % (self.uid, Markup.escape(info)))
+
+    def next_page(self) -> None:
+        self.set_page(self.page + 1)
+
+    def previous_page(self) -> None:
+        self.set_page(self.page - 1)
+
+    def set_page(self, page: int) -> None:
+        """
+        Show page, the first page is 0
+        """
+        with self._page_lock:
+            page = min(max(0, int(page)), self.page_count - 1)
+            if page == self.page:
+                return
+            if self.is_visible is False:
+                self.page = page
+                return
+            self._cache_page()
+            self.page = page
+            entry = self._page_cache.pop(page, None)
+            if entry is not None:
+                self._detach_cache_observers(entry)
+                for view, render_dirty in entry.views:  # parents first, so children don't get hidden again
+                    view.set_visible(True)
+                    view._render_dirty = render_dirty  # nothing changed while cached, html cached by the view is still valid
+                self._page_views = entry.page_views
+                html = entry.html
+            else:
+                self._page_views = self._create_page_views({})
+                html = self._render_rows()
+            self._invalidate_render_cache()
+            with self._instance.batched_calls():
+                self._instance.call_javascript("pyhtmlgui.update_element", ["%s_rows" % self.uid, html], skip_results=True)
+                self._update_page_info()
+
+    def set_visible(self, visible: bool) -> None:
+        if self.is_visible == visible:  # not changed
+            return
+        with self._page_lock:
+            super().set_visible(visible)
+            self._clear_page_cache()
+            for view in self._page_views:
+                view.delete(remove_from_dom=False)
+            self._page_views = []
+            if self.is_visible is True:  # we might have missed events while invisible
+                self._load_items()
+                self.count = self._get_count()
+                self.page = min(self.page, self.page_count - 1)
+                self._page_views = self._create_page_views({})
+
+    def _on_subject_updated(self, source, **kwargs) -> None:
+        with self._page_lock:
+            if self.is_visible is False:
+                return
+            position = self._apply_change(kwargs)
+            old_info = self.render_page_info()
+            self.count = self._get_count()
+            for page in list(self._page_cache.keys()):
+                if (page + 1) * self.page_size > position:
+                    self._evict_page(page)
+
+            page = min(self.page, self.page_count - 1)
+            with self._instance.batched_calls():
+                if page != self.page or (self.page + 1) * self.page_size > position:  # content of current page changed
+                    self.page = page
+                    self._refresh_page()
+                if self.render_page_info() != old_info:
+                    self._invalidate_render_cache()
+                    self._update_page_info()
+
+    def _on_cached_item_updated(self, source, **kwargs) -> None:
+        """
+        Something a cached page shows has changed, its html is outdated
+        """
+        with self._page_lock:
+            for page, entry in list(self._page_cache.items()):
+                if id(source) in entry.subjects:
+                    self._evict_page(page)
+
+    def _refresh_page(self) -> None:
+        """
+        Render current page again after the collection changed, views of items that stay on the page are reused
+        """
+        reusable = {}
+        for view in self._page_views:
+            reusable.setdefault(view._reuse_key, []).append(view)
+        self._page_views = self._create_page_views(reusable)
+        for views in reusable.values():
+            for view in views:
+                view.delete(remove_from_dom=False)
+        self._invalidate_render_cache()
+        self._instance.call_javascript("pyhtmlgui.update_element", ["%s_rows" % self.uid, self._render_rows()], skip_results=True)
+
+    def _create_page_views(self, reusable: dict) -> list:
+        views = []
+        start = self.page * self.page_size
+        for position, (key, item) in enumerate(self._get_page_items(start, start + self.page_size)):
+            reuse_key = self._get_reuse_key(key, item)
+            candidates = reusable.get(reuse_key)
+            if candidates:
+                view = candidates.pop(0)
+                if view._element_index != start + position and view.element_index_used is True:
+                    view._render_dirty = True  # shows its old index
+            else:
+                view = self._create_item(item, key)
+                view._reuse_key = reuse_key
+                view.element_index_used = False
+            view._element_index = start + position
+            views.append(view)
+        return views
+
+    def _render_rows(self) -> str:
+        return "".join(str(view.render() or "") for view in self._page_views)
+
+    def _update_page_info(self) -> None:
+        self._instance.call_javascript("pyhtmlgui.replace_element", ["%s_info" % self.uid, self.render_page_info()], skip_results=True)
+
+    def _cache_page(self) -> None:
+        """
+        Move views of the current page to the page cache, or delete them if the page can't be cached
+        """
+        entry = PageCacheEntry(self.page, self._page_views, self._render_rows())
+        for view in self._page_views:
+            entry.add_view(view)
+        self._page_views = []
+        if self.page_cache_size < 1 or entry.cacheable is False:
+            for view in entry.page_views:
+                view.delete(remove_from_dom=False)
+            return
+        for view in entry.page_views:
+            view.set_visible(False)
+        for subject in entry.subjects.values():
+            subject.attach_observer(self._on_cached_item_updated)
+        self._page_cache[self.page] = entry
+        while len(self._page_cache) > self.page_cache_size:
+            self._evict_page(next(iter(self._page_cache.keys())))
+
+    def _evict_page(self, page: int) -> None:
+        entry = self._page_cache.pop(page)
+        self._detach_cache_observers(entry)
+        for view in entry.page_views:
+            view.delete(remove_from_dom=False)
+
+    def _detach_cache_observers(self, entry: PageCacheEntry) -> None:
+        still_cached = set()
+        for other in self._page_cache.values():
+            still_cached.update(other.subjects.keys())
+        for subject_id, subject in entry.subjects.items():
+            if subject_id not in still_cached:
+                subject.detach_observer(self._on_cached_item_updated)
+
+    def _clear_page_cache(self) -> None:
+        for page in list(self._page_cache.keys()):
+            self._evict_page(page)
+
+    @abc.abstractmethod
+    def _create_item(self, item, key) -> PyHtmlView:
+        """
+        Create view of item
+        """
+
+    def _load_items(self) -> None:
+        """
+        Called when the view becomes visible, to (re)build index structures of the subject
+        """
+        pass
+
+    def _get_count(self) -> int:
+        return len(self.subject)
+
+    @abc.abstractmethod
+    def _get_page_items(self, start: int, end: int) -> list:
+        """
+        Return (key, item) pairs of the items from position start to end
+        """
+
+    def _get_reuse_key(self, key, item):
+        return id(item)
+
+    @abc.abstractmethod
+    def _apply_change(self, kwargs: dict) -> int:
+        """
+        Apply change event of subject to index structures, return first position that changed
+        """
+
+
+class PageCacheEntry:
+    def __init__(self, page: int, page_views: list, html: str):
+        self.page = page
+        self.page_views = page_views
+        self.html = html
+        self.views = []  # (view, render dirty) of page views and all their visible children, parents first
+        self.subjects = {}  # id -> everything these views observe
+        self.cacheable = True  # False if the html might be outdated when the page is shown again
+
+    def add_view(self, view: PyHtmlView) -> None:
+        if view.is_visible is False:
+            return
+        self.views.append((view, view._render_dirty))
+        for mapping in view._observables.mappings:
+            subject = mapping.subject()
+            if subject is not None:
+                self.subjects[id(subject)] = subject
+        if view._on_subject_updated is not None and len(view._observables.mappings) == 0:
+            self.cacheable = False  # view can not notice changes, neither can we
+        if type(view).set_visible is not PyHtmlView.set_visible:
+            self.cacheable = False  # collection views create new child views when shown again, the html has the uids of the old ones
+        for child in list(view._children):
+            self.add_view(child)
+
+
+class PagedListView(PagedView):
+    """
+    Paged view of an ObservableList, item views can use element_index() like in ObservableListView
+    """
+    def _create_item(self, item, key):
+        obj = self._item_class(item, self, **self._kwargs)
+        obj.element_index = types.MethodType(lambda x: x.parent.get_element_index(x), obj)
+        return obj
+
+    def _get_page_items(self, start: int, end: int) -> list:
+        return list(enumerate(self.subject[start:end], start))
+
+    def _apply_change(self, kwargs: dict) -> int:
+        if kwargs.get("action") in ["append", "insert", "setitem", "extend", "remove", "pop", "delitem"]:
+            index = kwargs["index"]
+            if index < 0:  # list.insert with negative index
+                index = max(0, len(self.subject) + index)
+            return index
+        return 0  # sort, reverse, clear or unknown change
+
+    def get_element_index(self, element):
+        """
+        Index of element in list
+        """
+        element.element_index_used = True
+        return element._element_index
+
+
+class PagedDictView(PagedView):
+    """
+    Paged view of an ObservableDict, items are ordered by key like in ObservableDictView
+    """
+    def __init__(self, *args, **kwargs):
+        self._keys = []  # sorted keys of subject
+        super().__init__(*args, **kwargs)
+
+    def _create_item(self, item, key):
+        obj = self._item_class(item, self, **self._kwargs)
+        obj.element_key = types.MethodType(lambda x: key, obj)
+        return obj
+
+    def _load_items(self) -> None:
+        self._keys = sorted(self.subject.keys())
+
+    def _get_count(self) -> int:
+        return len(self._keys)
+
+    def _get_page_items(self, start: int, end: int) -> list:
+        subject = self.subject
+        return [(key, subject[key]) for key in self._keys[start:end]]
+
+    def _get_reuse_key(self, key, item):
+        return key, id(item)
+
+    def _apply_change(self, kwargs: dict) -> int:
+        action = kwargs.get("action")
+        if action == "setitem":
+            return self._add_key(kwargs["key"])
+        if action == "update":
+            return min([self._add_key(key) for key, item in kwargs["items"]], default=len(self._keys))
+        if action in ["delitem", "pop", "popitem"]:
+            position = bisect.bisect_left(self._keys, kwargs["key"])
+            if position < len(self._keys) and self._keys[position] == kwargs["key"]:
+                del self._keys[position]
+            return position
+        self._load_items()  # clear or unknown change
+        return 0
+
+    def _add_key(self, key) -> int:
+        position = bisect.bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+        return position
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import json
 import time
 import typing
 import weakref
@@ -11,6 +12,8 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from pyhtmlgui.lib.observable import Observable
 from pyhtmlgui.pyhtmlguiInstance import PyHtmlGuiInstance
+from pyhtmlgui.lib.observableObject import ObservableObject, changes_attributes
+from pyhtmlgui.dependencyTracking import start_recording, stop_recording
 
 CHARACTERS = list(string.ascii_lowercase + string.digits)
 
@@ -21,6 +24,9 @@ class PyHtmlView:
     DOM_ELEMENT = "div"
     DOM_ELEMENT_CLASS = ""
     DOM_ELEMENT_EXTRAS = ""
+    RENDER_CACHE = False  # reuse last rendered html if nothing changed, only set to True if the template and DOM_ELEMENT_EXTRAS use observed data only
+    OBSERVED_ATTRIBUTES = None  # if the subject is an ObservableObject, only update if one of these attributes is set, None for all
+    TRACK_DEPENDENCIES = False  # observe the observables and attributes the template reads, instead of the subject
 
     def __init__(self, subject, parent:  typing.Union[PyHtmlView, PyHtmlGuiInstance], **kwargs):
         self.uid = "pv%s" % ("".join(random.choices(CHARACTERS, k=16)))
@@ -31,17 +37,28 @@ class PyHtmlView:
         self._parent_wref = weakref.ref(parent, None)
 
         self._instance = parent if type(parent) == PyHtmlGuiInstance else parent._instance
+        self._instance._register_view(self)
         self._was_rendered = False
         self._last_rendered = 0
         self._observables = ObservableMappings()
         self._children = weakref.WeakSet()
         self._subject = None  # this is replace for a short time on render by the actual resolved object
+        self._render_cache = None
+        self._render_dirty = True
+        self._render_cache_enabled = self.RENDER_CACHE
+        self._last_sent_hash = None  # hash of html last sent by update(), None if frontend might show something else
+        self._dependencies = {}  # id -> (weak reference, attribute names or None), observed if TRACK_DEPENDENCIES is set
 
-        if self._on_subject_updated is not None: # by default we observe the subject
+        if self.TRACK_DEPENDENCIES is True:  # observed after render
+            pass
+        elif self._on_subject_updated is not None: # by default we observe the subject
             try:
                 self.add_observable(self.subject)
             except Exception as e:
+                self._render_cache_enabled = False  # we would not notice changes
                 logging.warning("object type '%s' can not be observed, %s" % (type(subject),e))
+        else:
+            self._render_cache_enabled = False
 
     @property
     def subject(self):
@@ -54,6 +71,8 @@ class PyHtmlView:
         return self._parent_wref()
 
     def _on_subject_updated(self, source, **kwargs) -> None:
+        if self.OBSERVED_ATTRIBUTES is not None and changes_attributes(kwargs, self.OBSERVED_ATTRIBUTES) is False:
+            return
         self.update()
 
     def _on_subject_died(self, wr) -> None:
@@ -64,12 +83,18 @@ class PyHtmlView:
             Return object rendered to html string. This function should be called from inside the jinja templates.
             Direct usage is not needed, Returns html string rendered from template
         """
+        if self._render_dirty is False and self.is_visible is True and self._render_cache is not None:
+            self._was_rendered = True
+            return self._render_cache
+
         self._subject = self.subject  # receive hard reference to obj so it does not die on us while rendering
         if self._subject is None:  # Observed object died before render
             return None
 
         if self.is_visible is False:
             self.set_visible(True)
+        self._render_dirty = False  # updates while we render set this again
+        self._last_sent_hash = None  # html we return might be sent by someone else
 
         for child in self._children:
             try:
@@ -77,12 +102,18 @@ class PyHtmlView:
             except:
                 pass
 
+        recorder = start_recording() if self.TRACK_DEPENDENCIES is True else None
         try:
-            html = self._instance.get_template(self).render({"pyview": self})
+            html = self._instance.get_template(self).render({"pyview": self, "_create_py_function_reference": self._instance._create_function_reference})
         except Exception:
             html = " Exception while rendering Template: %s\n %s" % (self.__class__.__name__, traceback.format_exc().replace("\n", "\n  ").strip())
             self._instance.call_javascript("pyhtmlgui.debug_msg", [html])
             logging.error(html)
+        finally:
+            if recorder is not None:
+                stop_recording(recorder)
+        if recorder is not None:
+            self._set_dependencies(recorder.dependencies)
 
         for child in self._children:
             try:
@@ -99,31 +130,92 @@ class PyHtmlView:
         if html is None:
             return None
         if self.DOM_ELEMENT is None:
-            return Markup(html)
+            html = Markup(html)
         else:
             cls = self.DOM_ELEMENT_CLASS
             if cls == "":   cls = self.__class__.__name__
             if cls is None: cls = ""
             if cls != "":   cls = 'class="%s"' % cls
-            return Markup('<%(el)s %(cls)s id="%(uid)s" %(ex)s>%(html)s</%(el)s>' % {
+            html = Markup('<%(el)s %(cls)s id="%(uid)s" %(ex)s>%(html)s</%(el)s>' % {
                 "el"  : self.DOM_ELEMENT,
                 "cls" : cls,
                 "uid" : self.uid,
                 "ex"  : self.DOM_ELEMENT_EXTRAS,
                 "html": html,
             })
+        if self._render_cache_enabled is True:
+            self._render_cache = html
+        return html
+
+    def _set_dependencies(self, dependencies: dict) -> None:
+        """
+        Observe what the template read in the last render, stop observing what it did not read anymore
+        """
+        new_dependencies = {}
+        for key, (observable, attributes) in dependencies.items():
+            if isinstance(observable, ObservableObject) is False:
+                attributes = None  # other observables don't tell what changed
+            new_dependencies[key] = (weakref.ref(observable), None if attributes is None else frozenset(attributes))
+        for key, (observable_ref, attributes) in self._dependencies.items():
+            observable = observable_ref()
+            if observable is not None and new_dependencies.get(key, (None, None)) != (observable_ref, attributes):
+                self.remove_observable(observable, self._on_dependency_updated)
+        for key, (observable_ref, attributes) in new_dependencies.items():
+            if self._dependencies.get(key, (None, None)) != (observable_ref, attributes):
+                self.add_observable(observable_ref(), self._on_dependency_updated, attributes)
+        self._dependencies = new_dependencies
+
+    def _on_dependency_updated(self, source, **kwargs) -> None:
+        self.update()
+
+    def _invalidate_render_cache(self, frontend_changed: bool = True) -> None:
+        """
+        Our rendered html changed, so does the html of all our parents.
+        Their elements in the frontend don't show the html they last sent anymore, so their next update() is not suppressed
+        :param frontend_changed: False if our own element is replaced by update(), True if it is changed in any other way,
+                                 like inserting, moving or removing child elements
+        """
+        view = self
+        while isinstance(view, PyHtmlView):
+            view._render_dirty = True
+            if view is not self or frontend_changed is True:
+                view._last_sent_hash = None
+            view = view.parent
 
     def update(self) -> None:
         """
         update rendered view in DOM, must be visible
         """
         if self.is_visible is True:
-            html_content = self.render()
-            if html_content is not None:  # object might have died, in that case don't render
-                self._instance.call_javascript("pyhtmlgui.replace_element", [self.uid, html_content], skip_results=True)
+            self._invalidate_render_cache(frontend_changed=False)
+            if self._instance._update_scheduler is not None:
+                self._instance._update_scheduler.schedule(self)
+            else:
+                self._update()
         else:
             logging.warning("Can't update invisible components")
 
+    def _update(self) -> None:
+        last_sent_hash = self._last_sent_hash
+        html_content = self.render()
+        if html_content is None:  # object might have died, in that case don't render
+            return
+        html_hash = hash(html_content)
+        if html_hash == last_sent_hash:  # frontend already shows this
+            self._last_sent_hash = html_hash
+            self._instance._count_suppressed_update(self)
+            return
+        self._last_sent_hash = html_hash
+        if self._instance._dom_mirror is not None and self.DOM_ELEMENT is not None:
+            ops = self._instance._dom_mirror.diff(self.uid, html_content)
+            if ops is not None and len(ops) == 0:
+                self._instance._count_suppressed_update(self)
+                return
+            if ops is not None and len(json.dumps(ops)) < len(html_content):
+                self._instance.call_javascript("pyhtmlgui.patch_element", [self.uid, ops], skip_results=True)
+                return
+        self._instance.call_javascript("pyhtmlgui.replace_element", [self.uid, html_content], skip_results=True)
+
     def insert_element(self, index: int, element: PyHtmlView) -> bool:
         """
         Insert a new element into DOM at index.
@@ -131,15 +223,35 @@ class PyHtmlView:
         """
         html_content = element.render()
         if html_content is not None:  # object might have died, in that case don't render
+            self._invalidate_render_cache()
             self._instance.call_javascript("pyhtmlgui.insert_element", [self.uid, index, html_content], skip_results=True)
             return True
         return False
 
+    def insert_elements(self, index: int, elements: list) -> list:
+        """
+        Insert new elements into DOM at index, index + 1, ... with a single javascript call.
+        :return: Elements that were not inserted because their object died
+        """
+        contents = []
+        failed = []
+        for element in elements:
+            html_content = element.render()
+            if html_content is None:  # object might have died, in that case don't render
+                failed.append(element)
+            else:
+                contents.append(html_content)
+        if len(contents) > 0:
+            self._invalidate_render_cache()
+            self._instance.call_javascript("pyhtmlgui.insert_elements", [self.uid, index, contents], skip_results=True)
+        return failed
+
     def move_element(self, index: int, element: PyHtmlView) -> bool:
         """
         Move existing element to position index.
         This is used for example in ObservableDictView and ObservableListView to reorder elements without rerendering.
         """
+        self._invalidate_render_cache()
         self._instance.call_javascript("pyhtmlgui.move_element", [self.uid, index, element.uid], skip_results=True)
         return True
 
@@ -151,6 +263,8 @@ class PyHtmlView:
                                 because parent removes itself + all childen from dom automatically
         """
         if self.is_visible is True and remove_from_dom is True:
+            if isinstance(self.parent, PyHtmlView):
+                self.parent._invalidate_render_cache()
             self._instance.call_javascript("pyhtmlgui.remove_element", [self.uid], skip_results=True)
         self.set_visible(False)
         try:
@@ -168,6 +282,7 @@ class PyHtmlView:
 
         if visible is False:
             self.is_visible = False
+            self._render_dirty = True  # we miss events while invisible
             self._observables.disable()
             for child in self._children:
                 try:
@@ -214,10 +329,15 @@ class PyHtmlView:
         except: # ignore if weak ref faild to resolve
             pass
 
-    def add_observable(self, subject: Observable, target_function: typing.Callable = None) -> None:
+    def add_observable(self, subject: Observable, target_function: typing.Callable = None, attributes: typing.Iterable[str] = None) -> None:
+        """
+        :param attributes: If subject is an ObservableObject, call target_function only if one of these attributes is set
+        """
         if target_function is None:
             target_function = self._on_subject_updated
-        self._observables.add(subject,target_function)
+        self._observables.add(subject, target_function, attributes)
+        if self.is_visible is True:  # else enabled when we become visible
+            self._observables.get(subject, target_function).enable()
 
     def remove_observable(self, subject: Observable, target_function: typing.Callable = None) -> None:
         if target_function is None:
@@ -238,19 +358,19 @@ class ObservableMappings():
     def __init__(self):
         self.mappings = []
 
-    def add(self, subject, target):
+    def add(self, subject, target, attributes=None):
         try:
             if not callable(subject.attach_observer) or not callable(subject.detach_observer):
                 raise Exception("object type '%s' can not be observed" % type(subject))
         except Exception:
             raise Exception("object type '%s' can not be observed" % type(subject))
-        self.mappings.append(ObservableMapping(self, subject, target))
+        self.mappings.append(ObservableMapping(self, subject, target, attributes))
 
     def get(self, subject, target):
-        for mapping in self.mappings:
+        for mapping in reversed(self.mappings):
             try:
-                if subject == mapping.observable():
-                    if target is None or target == mapping.function():
+                if subject is mapping.subject():
+                    if target is None or target == mapping.target():
                         return mapping
             except:
                 pass
@@ -281,23 +401,34 @@ class ObservableMappings():
 
 
 class ObservableMapping():
-    def __init__(self, parent, subject, target):
+    def __init__(self, parent, subject, target, attributes=None):
         self.parent = parent
         self.subject = weakref.ref(subject, self._on_subject_died)
         self.target = weakref.WeakMethod(target, self._on_target_died)
+        self.attributes = None if attributes is None else frozenset(attributes)
 
     def enable(self):
         try: # objects might die on us
-            self.subject().attach_observer(self.target())
+            self.subject().attach_observer(self.target() if self.attributes is None else self._on_notify)
         except:
             pass
 
     def disable(self):
         try:  # objects might die on us
-            self.subject().detach_observer(self.target())
+            self.subject().detach_observer(self.target() if self.attributes is None else self._on_notify)
         except:
          pass
 
+    def _on_notify(self, source, **kwargs):
+        if changes_attributes(kwargs, self.attributes) is False:
+            return
+        target = self.target()
+        if target is not None:
+            if target.__code__.co_argcount > 1:
+                target(source, **kwargs)
+            else:
+                target()
+
     def _on_subject_died(self, *args):
         self.parent._child_died(self)
 
@@ -0,0 +1,199 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pyhtmlgui.lib.observableList import ObservableList
+import math
+import types
+from threading import Lock
+from markupsafe import Markup
+from .pyhtmlview import PyHtmlView
+
+
+class VirtualListView(PyHtmlView):
+    """
+    Scrollable list that only creates and renders item views for the rows in the viewport of the browser plus overscan rows.
+    The browser reports its scroll position, rows that scroll into the window are inserted, rows that leave it are removed.
+    All rows must have the same height, row_height in pixels.
+    """
+    TEMPLATE_STR = '''
+        {{ pyview.render_spacer("top") }}
+        <div id="{{ pyview.uid }}_rows">
+            {% for item in pyview.get_items() %}
+                {{ item.render() }}
+            {% endfor %}
+        </div>
+        {{ pyview.render_spacer("bottom") }}
+        <script>
+            (function(){
+                var element = document.getElementById("{{ pyview.uid }}");
+                var last_reported = null;
+                var pending = false;
+                var report = function(){
+                    pending = false;
+                    var current = Math.floor(element.scrollTop / {{ pyview.row_height }}) + "," + element.clientHeight;
+                    if(current !== last_reported){
+                        last_reported = current;
+                        pyview.set_viewport(element.scrollTop, element.clientHeight);
+                    }
+                };
+                element.scrollTop = {{ pyview.scroll_top }};
+                element.onscroll = function(){
+                    if(pending === false){
+                        pending = true;
+                        window.requestAnimationFrame(report);
+                    }
+                };
+                report();
+            })();
+        </script>
+    '''
+
+    def __init__(self,
+                 subject    : ObservableList,
+                 parent     : PyHtmlView,
+                 item_class : type[PyHtmlView],
+                 row_height : int = 30,
+                 height     : int = 400,
+                 overscan   : int = 10,
+                 dom_element: str = PyHtmlView.DOM_ELEMENT,
+                 **kwargs):
+        """
+        :param row_height: Height of one row in pixels, item views must render rows of exactly this height
+        :param height: Height of the scroll container in pixels, used until the browser reports its actual height
+        :param overscan: Number of rows rendered before and after the visible rows, so fast scrolling shows no empty space
+        """
+        self._item_class = item_class
+        self.DOM_ELEMENT = dom_element
+        self.DOM_ELEMENT_EXTRAS = 'style="overflow-y: auto; height: %spx"' % height
+        self.row_height = row_height
+        self.overscan = overscan
+        self.scroll_top = 0
+        self.viewport_height = height
+        self._kwargs = kwargs
+        self._first = 0  # list index of the first row in the window
+        self._length = 0  # length of the list when the window was last set
+        self._window_views = []
+        self._window_lock = Lock()
+        super().__init__(subject, parent)
+
+    def get_items(self) -> list:
+        return list(self._window_views)
+
+    def render_spacer(self, position: str) -> Markup:
+        """
+        Empty element with the height of all rows before (position "top") or after (position "bottom") the window
+        """
+        if position == "top":
+            rows = self._first
+        else:
+            rows = self._length - self._first - len(self._window_views)
+        return Markup('<div id="%s_%s" style="height: %spx"></div>' % (self.uid, position, rows * self.row_height))
+
+    def set_visible(self, visible: bool) -> None:
+        if self.is_visible == visible:  # not changed
+            return
+        with self._window_lock:
+            super().set_visible(visible)
+            for view in self._window_views:
+                view.delete(remove_from_dom=False)
+            self._window_views = []
+            if self.is_visible is True:
+                self._set_window()
+
+    def set_viewport(self, scroll_top: float, viewport_height: float) -> None:
+        """
+        Called by the browser when the list is scrolled or resized
+        """
+        with self._window_lock:
+            self.scroll_top = max(0, int(scroll_top))
+            self.viewport_height = max(0, int(viewport_height))
+            if self.is_visible is True:
+                self._refresh_window()
+
+    def _on_subject_updated(self, source, **kwargs):
+        with self._window_lock:
+            if self.is_visible is True:
+                self._refresh_window()
+
+    def _create_item(self, item):
+        obj = self._item_class(item, self, **self._kwargs)
+        obj.element_index = types.MethodType(lambda x: x.parent.get_element_index(x), obj)
+        obj.element_index_used = False
+        return obj
+
+    def _get_window(self, length: int) -> tuple:
+        """
+        First and last list index of rows that should be rendered for the current viewport
+        """
+        first_visible = self.scroll_top // self.row_height
+        visible_rows = math.ceil(self.viewport_height / self.row_height) + 1
+        last = min(length, first_visible + visible_rows + self.overscan)
+        first = min(max(0, first_visible - self.overscan), last)
+        return first, last
+
+    def _set_window(self) -> tuple:
+        """
+        Update window to current viewport and list, item views of rows that stay in the window are reused
+        :return: Views of the old window, and views that left the window
+        """
+        subject = self.subject
+        if subject is None:
+            return [], []
+        self._length = len(subject)
+        self._first, last = self._get_window(self._length)
+
+        reusable = {}
+        for view in self._window_views:
+            reusable.setdefault(id(view.subject), []).append(view)
+        old_views = self._window_views
+        self._window_views = []
+        for index, item in enumerate(subject[self._first:last]):
+            views = reusable.get(id(item))
+            view = views.pop(0) if views else self._create_item(item)
+            view._element_index_changed = getattr(view, "_element_index", None) != self._first + index
+            view._element_index = self._first + index
+            self._window_views.append(view)
+        return old_views, [view for views in reusable.values() for view in views]
+
+    def _refresh_window(self) -> None:
+        top, bottom = self.render_spacer("top"), self.render_spacer("bottom")
+        old_views, removed = self._set_window()
+        if len(old_views) == len(self._window_views) and all(a is b for a, b in zip(old_views, self._window_views)) \
+                and top == self.render_spacer("top") and bottom == self.render_spacer("bottom"):
+            return  # window and list length unchanged
+        self._invalidate_render_cache()
+
+        kept = set(id(view) for view in old_views) - set(id(view) for view in removed)
+        old_order = [view for view in old_views if id(view) in kept]
+        new_order = [view for view in self._window_views if id(view) in kept]
+        added = [(index, view) for index, view in enumerate(self._window_views) if id(view) not in kept]
+
+        with self._instance.batched_calls():
+            for position, html in (("top", top), ("bottom", bottom)):
+                spacer = self.render_spacer(position)
+                if spacer != html:
+                    self._instance.call_javascript("pyhtmlgui.replace_element", ["%s_%s" % (self.uid, position), spacer], skip_results=True)
+
+            if old_order == new_order and len(removed) + len(added) <= len(self._window_views):  # scrolled or rows inserted/removed
+                for view in removed:
+                    view.delete()
+                for index, view in added:  # in window order, so all rows before index are in place
+                    html = view.render()
+                    if html is not None:
+                        self._instance.call_javascript("pyhtmlgui.insert_element", ["%s_rows" % self.uid, index, html], skip_results=True)
+            else:  # jumped far or list was reordered, send the whole window
+                for view in removed:
+                    view.delete(remove_from_dom=False)
+                html = "".join(str(view.render() or "") for view in self._window_views)
+                self._instance.call_javascript("pyhtmlgui.update_element", ["%s_rows" % self.uid, html], skip_results=True)
+
+            for view in new_order:
+                if view._element_index_changed is True and view.element_index_used is True:
+                    view.update()
+
+    def get_element_index(self, element):
+        """
+        Index of element in list
+        """
+        element.element_index_used = True
+        return element._element_index
@@ -22,4 +22,7 @@ setuptools.setup(
     python_requires='>=3.7',
     package_data={'pyhtmlgui': ['assets/electron/*', 'assets/templates/*']},
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['pyhtmlgui-precompile=pyhtmlgui.precompile:main'],
+    },
 )